@@ -0,0 +1,179 @@
+# =============================================================================
+# QUANT-PRO - STATO INCREMENTALE DEI KPI (UN ACCUMULATORE PER ASSET x SOGLIA)
+# =============================================================================
+# Per ogni soglia della griglia: PnL cumulato (equity - capitale), picco, max drawdown, profitti/perdite lordi,
+# trade vinti/totali, PnL e trade per anno, trade codificati come in kpi_grid.
+#
+# Lo stato salvato copre solo le righe "assestate", più vecchie della finestra che
+# la cache riscarica (market_cache.OVERLAP): ogni run somma le nuove righe assestate,
+# poi le ultime (ancora rivedibili) su una copia usa e getta.
+# Ricostruzione completa se cambiano regole/griglia, se la cache segnala una revisione
+# prima dell'ultima riga assestata, se la coda salvata non coincide, o con QUANT_REBUILD=1.
+#
+# Accanto, data_cache/risk_<asset>.json: riepiloghi Monte Carlo per soglia indicizzati dall'hash
+# dei KPI MAX per soglia (risk.risk_grid), così si risimulano solo le soglie con trade nuovi o rivisti.
+
+import os
+import json
+import numpy as np
+from market_cache import CACHE_DIR, OVERLAP
+from payload_codec import write_if_changed
+from backtest import GRID_THR, KPI_FIELDS, rules, run_backtest, yearly_table
+
+STATE_SCHEMA = 1
+TAIL = 8
+SETTLE_DAYS = OVERLAP['1d'].days
+
+
+def state_path(name):
+    return os.path.join(CACHE_DIR, f"analytics_{name}.json")
+
+
+def load_state(name):
+    path = state_path(name)
+    if not os.path.exists(path): return None
+    try:
+        with open(path, encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return state if state.get('schema') == STATE_SCHEMA else None
+
+
+def _save_json(path, obj):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    write_if_changed(path, json.dumps(obj, separators=(',', ':')))
+
+
+def save_state(name, state):
+    _save_json(state_path(name), state)
+
+
+def risk_path(name):
+    return os.path.join(CACHE_DIR, f"risk_{name}.json")
+
+
+def load_risk(name):
+    # Riepiloghi Monte Carlo del run precedente per chiave dei trade (risk.risk_grid); {} se assenti
+    if os.getenv('QUANT_REBUILD') == '1': return {}
+    try:
+        with open(risk_path(name), encoding='utf-8') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return cache if isinstance(cache, dict) else {}
+
+
+def save_risk(name, cache):
+    _save_json(risk_path(name), cache)
+
+
+def new_state(mult, thr_grid=GRID_THR):
+    t = len(thr_grid)
+    capital = rules()['capital']
+    return {
+        'schema': STATE_SCHEMA, 'params': {**rules(), 'mult': mult, 'thr': list(thr_grid)},
+        'n': 0, 'tail': [],
+        'cum': [0.0] * t, 'peak': [capital] * t, 'max_dd': [0.0] * t,
+        'gp': [0.0] * t, 'gl': [0.0] * t, 'wins': [0] * t, 'trades': [0] * t,
+        'last_trade': [-1] * t, 'tr': [[] for _ in range(t)],
+        'years': [], 'ypnl': [[] for _ in range(t)], 'ytr': [[] for _ in range(t)],
+    }
+
+
+def fold(state, rows):
+    # Somma rows (le righe successive alle state['n'] già contate) nell'accumulatore
+    if not len(rows): return state
+    p = state['params']
+    thr = np.asarray(p['thr'], dtype='float64') / 100
+    res = run_backtest(rows, thr, p['mult'], cost=p['cost'], capital=p['capital'],
+                       vix_long=p['vix_long'], vix_short=p['vix_short'])
+    # cumsum ripartendo dal cumulato salvato: stessa sequenza di somme del ricalcolo completo
+    cum = np.cumsum(np.concatenate([np.asarray(state['cum'])[:, None], res['pnl']], axis=-1), axis=-1)[:, 1:]
+    equity = p['capital'] + cum
+    peak = np.maximum(np.maximum.accumulate(equity, axis=-1), np.asarray(state['peak'])[:, None])
+    dd = (peak - equity) / peak * 100
+    pnl, traded = res['pnl'], res['traded']
+    wins = traded & (pnl > 0)
+
+    state['cum'] = cum[:, -1].tolist()
+    state['peak'] = peak[:, -1].tolist()
+    state['max_dd'] = np.maximum(state['max_dd'], dd.max(axis=-1)).tolist()
+    state['gp'] = (np.asarray(state['gp']) + np.where(wins, pnl, 0.0).sum(axis=-1)).tolist()
+    state['gl'] = (np.asarray(state['gl']) - np.where(traded & ~wins, pnl, 0.0).sum(axis=-1)).tolist()
+    state['wins'] = (np.asarray(state['wins']) + wins.sum(axis=-1)).tolist()
+    state['trades'] = (np.asarray(state['trades']) + traded.sum(axis=-1)).tolist()
+
+    for t in range(len(thr)):
+        idx = np.flatnonzero(traded[t])
+        if not len(idx): continue
+        state['tr'][t] += (np.diff(idx + state['n'], prepend=state['last_trade'][t]) * res['pos'][t][idx]).tolist()
+        state['last_trade'][t] = int(idx[-1] + state['n'])
+
+    years, ypnl, ytr = yearly_table(rows, res)
+    for j, y in enumerate(years.tolist()):
+        if y not in state['years']:
+            state['years'].append(y)
+            for t in range(len(thr)):
+                state['ypnl'][t].append(0.0)
+                state['ytr'][t].append(0)
+        k = state['years'].index(y)
+        for t in range(len(thr)):
+            state['ypnl'][t][k] += float(ypnl[t, j])
+            state['ytr'][t][k] += int(ytr[t, j])
+
+    state['tail'] = (state['tail'] + [list(r) for r in rows[-TAIL:].tolist()])[-TAIL:]
+    state['n'] += len(rows)
+    return state
+
+
+def _clone(state):
+    # fold modifica in place solo le liste per soglia: bastano copie di primo livello
+    out = dict(state)
+    for k in ('tr', 'ypnl', 'ytr'): out[k] = [list(x) for x in state[k]]
+    out['years'] = list(state['years'])
+    return out
+
+
+def _usable(state, rows, mult, thr_grid, revised_day):
+    if state is None or os.getenv('QUANT_REBUILD') == '1': return False
+    if state['params'] != {**rules(), 'mult': mult, 'thr': list(thr_grid)}: return False
+    n = state['n']
+    if n > len(rows): return False
+    if revised_day is not None and n and revised_day <= rows['d'][n - 1]: return False
+    return [list(r) for r in rows[max(0, n - TAIL):n].tolist()] == state['tail']
+
+
+def advance(name, rows, mult, thr_grid=GRID_THR, revised_day=None, persist=True):
+    # Restituisce (stato su tutte le righe, modalità): 'incremental' o 'rebuild'
+    settled = int(np.searchsorted(rows['d'], rows['d'][-1] - SETTLE_DAYS, side='right')) if len(rows) else 0
+    state = load_state(name) if persist else None
+    mode = 'incremental'
+    if not _usable(state, rows, mult, thr_grid, revised_day) or state['n'] > settled:
+        state, mode = new_state(mult, thr_grid), 'rebuild'
+    fold(state, rows[state['n']:settled])
+    if persist: save_state(name, state)
+    return fold(_clone(state), rows[settled:]), mode
+
+
+def grid_summary(state):
+    # KPI MAX e trade nello stesso formato di backtest.kpi_grid
+    trades = np.asarray(state['trades'])
+    gp, gl = np.asarray(state['gp']), np.asarray(state['gl'])
+    capital = state['params']['capital']
+    equity = capital + np.asarray(state['cum'])
+    k = {
+        'profit': equity - capital,
+        'win_rate': np.where(trades > 0, np.asarray(state['wins']) / np.maximum(trades, 1) * 100, 0.0),
+        'trades': trades,
+        'max_dd': np.asarray(state['max_dd']),
+        'pf': np.where(gl > 0, gp / np.where(gl > 0, gl, 1), gp),
+    }
+    order = np.argsort(state['years']) if state['years'] else np.arange(0)
+    return {
+        'kpi': np.stack([k[f] for f in KPI_FIELDS], axis=-1),
+        'tr': state['tr'],
+        'years': np.asarray(state['years'], dtype=np.int64)[order],
+        'ypnl': np.asarray(state['ypnl'], dtype='float64').reshape(len(trades), -1)[:, order],
+        'ytr': np.asarray(state['ytr'], dtype=np.int64).reshape(len(trades), -1)[:, order],
+    }
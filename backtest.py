@@ -0,0 +1,144 @@
+# =============================================================================
+# QUANT-PRO - BACKTEST VETTORIALE (UNICA FONTE DELLE REGOLE PER DASHBOARD E BOT)
+# =============================================================================
+# Regole (identiche a run() nella dashboard):
+#   LONG  se m >  thr e VIX < VIX_LONG
+#   SHORT se m < -thr e VIX < VIX_SHORT
+#   punti = ±(out - in) - COSTO, pnl = punti * moltiplicatore, equity da CAPITALE
+# thr è una frazione (0.30% -> 0.003).
+
+import os
+import numpy as np
+from payload_codec import DATA_DIR, RECORD_FIELDS
+from universe import UNIVERSE, multipliers
+
+CAPITALE = 20000
+COSTO = 2
+VIX_LONG = 25
+VIX_SHORT = 32
+MOLTIPLICATORI = multipliers(UNIVERSE)
+# Componente ES del momentum dalla finestra oraria 00-08 CET (intraday.py); QUANT_FUT_WINDOW=0 -> variazione giornaliera
+FUT_WINDOW = os.getenv('QUANT_FUT_WINDOW', '1') != '0'
+
+# Soglie di default in %: pagina (input #thr, /api/signal, audit snapshot) e report del bot.
+# Il Monte Carlo usa i percorsi pieni proprio su queste (risk.FOCUS_THR)
+SOGLIA_DASHBOARD = 0.30
+SOGLIA_BOT = 0.70
+
+# Griglia precalcolata per la dashboard: soglie in % e finestre zoom (0 = MAX)
+GRID_THR = [round(0.05 * k, 2) for k in range(1, 31)]
+GRID_ZOOM = [22, 66, 252, 504, 0]
+KPI_FIELDS = ['profit', 'win_rate', 'trades', 'max_dd', 'pf']
+
+# Layout di payload_codec.RECORD ('<idddd', senza padding)
+ROW_DTYPE = np.dtype([('d', '<i4')] + [(f, '<f8') for f in RECORD_FIELDS[1:]])
+
+
+def rules():
+    return {'capital': CAPITALE, 'cost': COSTO, 'vix_long': VIX_LONG, 'vix_short': VIX_SHORT, 'mult': MOLTIPLICATORI,
+            'fut_window': FUT_WINDOW}
+
+
+def load_rows(meta, name, tail=None, data_dir=DATA_DIR):
+    # Array strutturato mappato in memoria: con tail si toccano solo le ultime pagine
+    path = os.path.join(data_dir, meta['assets'][name]['file'])
+    if os.path.getsize(path) == 0: return np.empty(0, dtype=ROW_DTYPE)
+    rows = np.memmap(path, dtype=ROW_DTYPE, mode='r')
+    return rows if tail is None else rows[-tail:]
+
+
+def signals(m, v, thr, vix_long=VIX_LONG, vix_short=VIX_SHORT):
+    # thr scalare o colonna (T, 1): con più soglie si ottiene una matrice (T, n)
+    long_ = (m > thr) & (v < vix_long)
+    short = (m < -thr) & (v < vix_short) & ~long_
+    return long_.astype(np.int8) - short.astype(np.int8)
+
+
+def run_backtest(rows, thr, mult, cost=COSTO, capital=CAPITALE, vix_long=VIX_LONG, vix_short=VIX_SHORT):
+    thr = np.asarray(thr, dtype='float64')
+    if thr.ndim: thr = thr[:, None]
+    pos = signals(rows['m'], rows['v'], thr, vix_long, vix_short)
+    traded = pos != 0
+    pts = np.where(traded, pos * (rows['out'] - rows['in']) - cost, 0.0)
+    pnl = pts * mult
+    equity = capital + np.cumsum(pnl, axis=-1)
+    peak = np.maximum(np.maximum.accumulate(equity, axis=-1), capital)
+    dd = (peak - equity) / peak * 100
+    return {'pos': pos, 'traded': traded, 'pts': pts, 'pnl': pnl, 'equity': equity, 'dd': dd, 'capital': capital}
+
+
+def kpi_arrays(res):
+    # KPI lungo l'ultimo asse: scalari per una soglia, vettori (T,) per la griglia
+    traded, pnl = res['traded'], res['pnl']
+    wins = traded & (pnl > 0)
+    trades = traded.sum(axis=-1)
+    g_p = np.where(wins, pnl, 0.0).sum(axis=-1)
+    g_l = -np.where(traded & ~wins, pnl, 0.0).sum(axis=-1)
+    empty = pnl.shape[-1] == 0
+    return {
+        'profit': np.zeros(pnl.shape[:-1]) if empty else res['equity'][..., -1] - res['capital'],
+        'win_rate': np.where(trades > 0, wins.sum(axis=-1) / np.maximum(trades, 1) * 100, 0.0),
+        'trades': trades,
+        'max_dd': np.zeros(pnl.shape[:-1]) if empty else res['dd'].max(axis=-1),
+        'pf': np.where(g_l > 0, g_p / np.where(g_l > 0, g_l, 1), g_p),
+    }
+
+
+def kpi_grid(rows, mult, thr_grid=GRID_THR, zooms=GRID_ZOOM, full=None):
+    # KPI per ogni (soglia, zoom) + trade della finestra MAX codificati come
+    # salti di indice con segno (+ LONG, - SHORT): la pagina ricostruisce l'equity senza ricalcolare i segnali.
+    # full = analytics_state.grid_summary: finestra MAX già accumulata, si calcolano solo gli zoom brevi
+    thr = np.asarray(thr_grid, dtype='float64') / 100
+    kpi = np.empty((len(thr), len(zooms), len(KPI_FIELDS)))
+    res_max = None
+    for j, z in enumerate(zooms):
+        if not z and full is not None:
+            kpi[:, j] = full['kpi']
+            continue
+        res = run_backtest(rows[-z:] if z else rows, thr, mult)
+        if not z: res_max = res
+        k = kpi_arrays(res)
+        kpi[:, j] = np.stack([k[f] for f in KPI_FIELDS], axis=-1)
+    if full is None:
+        if res_max is None: res_max = run_backtest(rows, thr, mult)
+        tr = []
+        for t in range(len(thr)):
+            idx = np.flatnonzero(res_max['traded'][t])
+            tr.append((np.diff(idx, prepend=-1) * res_max['pos'][t][idx]).tolist())
+        # Riepilogo annuale del journal (stessa aggregazione della tabella del bot)
+        years, ypnl, ytr = yearly_table(rows, res_max)
+    else:
+        tr, years, ypnl, ytr = full['tr'], full['years'], full['ypnl'], full['ytr']
+    return {'thr': list(thr_grid), 'zoom': list(zooms), 'fields': KPI_FIELDS, 'kpi': np.round(kpi, 2).tolist(), 'tr': tr,
+            'years': years.tolist(), 'ypnl': np.round(ypnl, 2).tolist(), 'ytr': ytr.tolist()}
+
+
+def years_of(days):
+    return days.astype('datetime64[D]').astype('datetime64[Y]').astype(np.int64) + 1970
+
+
+def yearly_table(rows, res):
+    # Anni dello storico e, lungo l'ultimo asse, PnL e numero di trade per anno: (Y,), (..., Y), (..., Y)
+    years, inv = np.unique(years_of(rows['d']), return_inverse=True)
+    shape = res['traded'].shape[:-1] + (len(years),)
+    if not len(rows): return years, np.zeros(shape), np.zeros(shape, dtype=np.int64)
+    traded = res['traded'].reshape(-1, len(rows))
+    pnl = np.where(traded, res['pnl'].reshape(-1, len(rows)), 0.0)
+    sums = np.stack([np.bincount(inv, weights=p, minlength=len(years)) for p in pnl])
+    counts = np.stack([np.bincount(inv, weights=t, minlength=len(years)) for t in traded]).astype(np.int64)
+    return years, sums.reshape(shape), counts.reshape(shape)
+
+
+def yearly_pnl(rows, res):
+    # Solo gli anni con almeno un trade, come la tabella annuale del bot
+    years, sums, counts = yearly_table(rows, res)
+    return {str(int(y)): float(s) for y, s, n in zip(years, sums, counts) if n}
+
+
+def trade_list(rows, res, last=None):
+    # rows può essere un prefisso delle righe su cui è stato calcolato res
+    idx = np.flatnonzero(res['traded'][:len(rows)])
+    if last is not None: idx = idx[-last:]
+    days = rows['d'][idx].astype('datetime64[D]').astype(str)
+    return [{'d': d, 'p': int(res['pos'][i]), 'in': float(rows['in'][i]), 'out': float(rows['out'][i]),
+             'pts': float(res['pts'][i]), 'pnl': float(res['pnl'][i])} for d, i in zip(days, idx)]
@@ -0,0 +1,73 @@
+# =============================================================================
+# QUANT-PRO - MICRO-BENCHMARK: HISTORY / CANDELE ITERROWS vs COLONNARE
+# Uso: python benchmarks/bench_history.py [righe] [ripetizioni]
+# =============================================================================
+
+import os
+import sys
+import timeit
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from market_transform import history_records, candle_records
+
+
+def legacy_history(temp_df):
+    history = []
+    for dt, row in temp_df.iterrows():
+        history.append({
+            'd': dt.strftime('%Y-%m-%d'), 'm': float(row['MOM']), 'v': float(row['VIX']),
+            'in': float(row['InP']), 'out': float(row['OutP'])
+        })
+    return history
+
+
+def legacy_candles(df_raw, tk):
+    try:
+        subset = df_raw.xs(tk, axis=1, level=1).dropna().tail(5)
+        return [{
+            'd': i.strftime('%d %b'),
+            'o': float(r['Open']),
+            'h': float(r['High']),
+            'l': float(r['Low']),
+            'c': float(r['Close'])
+        } for i, r in subset.iterrows()]
+    except: return []
+
+
+def synthetic_frame(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    idx = pd.bdate_range('1990-01-01', periods=rows)
+    out = 1000 * np.exp(np.cumsum(rng.normal(0, 0.01, rows)))
+    return pd.DataFrame({
+        'InP': out * (1 + rng.normal(0, 0.002, rows)),
+        'OutP': out,
+        'MOM': rng.normal(0, 0.008, rows),
+        'VIX': rng.uniform(10, 45, rows),
+    }, index=idx)
+
+
+def synthetic_ohlc(rows, seed=0):
+    f = synthetic_frame(rows, seed)
+    ohlc = pd.DataFrame({'Open': f['InP'], 'High': f[['InP', 'OutP']].max(axis=1) * 1.003,
+                         'Low': f[['InP', 'OutP']].min(axis=1) * 0.997, 'Close': f['OutP'], 'Volume': 1e6})
+    return pd.concat({'^GSPC': ohlc}, axis=1).swaplevel(0, 1, axis=1)
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 9000
+    reps = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    temp_df = synthetic_frame(rows)
+    df_raw = synthetic_ohlc(rows)
+
+    assert legacy_history(temp_df) == history_records(temp_df), "history diversa dalla versione iterrows"
+    assert legacy_candles(df_raw, '^GSPC') == candle_records(df_raw, '^GSPC'), "candele diverse dalla versione iterrows"
+
+    t_old = min(timeit.repeat(lambda: legacy_history(temp_df), number=1, repeat=reps))
+    t_new = min(timeit.repeat(lambda: history_records(temp_df), number=1, repeat=reps))
+    c_old = min(timeit.repeat(lambda: legacy_candles(df_raw, '^GSPC'), number=1, repeat=reps))
+    c_new = min(timeit.repeat(lambda: candle_records(df_raw, '^GSPC'), number=1, repeat=reps))
+
+    print(f"history ({rows} righe): iterrows {t_old*1000:.1f} ms | colonnare {t_new*1000:.1f} ms | x{t_old/t_new:.1f}")
+    print(f"candele: iterrows {c_old*1000:.2f} ms | colonnare {c_new*1000:.2f} ms | x{c_old/c_new:.1f}")
@@ -0,0 +1,134 @@
+# =============================================================================
+# QUANT-PRO - BENCHMARK DELLA PIPELINE DOPO IL DOWNLOAD (JSON CONFRONTABILE TRA COMMIT)
+# Uso: python benchmarks/bench_pipeline.py [--tickers 9] [--years 30] [--memory] [--out bench.json]
+# =============================================================================
+
+import os
+import io
+import sys
+import json
+import time
+import argparse
+import platform
+import resource
+import tempfile
+import subprocess
+import tracemalloc
+import contextlib
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import synthetic_market
+import quant_pro_engine as engine
+import bot
+from market_transform import momentum, asset_frame, history_columns, history_array, rounded_rows, candle_records
+from payload_codec import split_payload
+from backtest import MOLTIPLICATORI, SOGLIA_DASHBOARD, rules, kpi_grid
+from risk import risk_grid
+
+
+def _rss_mb():
+    # ru_maxrss: KB su Linux, byte su macOS
+    r = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return r / (1024 * 1024) if sys.platform == 'darwin' else r / 1024
+
+
+def _git_rev():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    except Exception:
+        return None
+
+
+class Bench:
+    def __init__(self, memory=False):
+        self.memory = memory
+        self.stages = {}
+
+    def stage(self, name, fn, out_bytes=None):
+        rss0 = _rss_mb()
+        if self.memory: tracemalloc.start()
+        t0 = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = fn()
+        wall = time.perf_counter() - t0
+        entry = {'wall_s': round(wall, 5), 'peak_rss_mb': round(_rss_mb(), 1), 'rss_growth_mb': round(_rss_mb() - rss0, 1)}
+        if self.memory:
+            entry['py_peak_mb'] = round(tracemalloc.get_traced_memory()[1] / 2**20, 1)
+            tracemalloc.stop()
+        if out_bytes is not None: entry['out_bytes'] = out_bytes(result)
+        self.stages[name] = entry
+        return result
+
+
+def run(n_tickers, years, memory=False, seed=0):
+    df_raw, fut_h, targets = synthetic_market(n_tickers, years, seed)
+    b = Bench(memory)
+
+    # Stadi singoli di build_market_data, un asset alla volta come nel motore (build_asset)
+    p_h = b.stage('frame_split', lambda: df_raw['Close'])
+    b.stage('candles', lambda: [candle_records(df_raw, tk) for tk in ('^GSPC', '^N225', 'ES=F')])
+    mom = b.stage('momentum', lambda: momentum(p_h))
+    vix = p_h['^VIX']
+    bars = {n: df_raw.xs(tk, axis=1, level=1)[['Open', 'Close']] for n, tk in targets.items() if tk in p_h.columns}
+    frames = b.stage('asset_frame', lambda: {n: asset_frame(x, mom, vix) for n, x in bars.items()})
+    b.stage('history_columns', lambda: {n: history_columns(f) for n, f in frames.items()},
+            out_bytes=lambda r: len(json.dumps(r, separators=(',', ':'))))
+    arrays = b.stage('history_array', lambda: {n: history_array(f) for n, f in frames.items()},
+                     out_bytes=lambda r: sum(a.nbytes for a in r.values()))
+    b.stage('kpi_grid', lambda: {n: kpi_grid(rounded_rows(a), MOLTIPLICATORI.get(n, 1)) for n, a in arrays.items()})
+    b.stage('risk', lambda: {n: risk_grid(rounded_rows(a), MOLTIPLICATORI.get(n, 1)) for n, a in arrays.items()})
+    del frames, arrays
+    # Asset completo (righe, griglia, rischio, LTTB, blob) senza stato incrementale
+    b.stage('build_asset', lambda: {n: engine.build_asset(n, x, mom, vix, MOLTIPLICATORI.get(n, 1), incremental=False)
+                                    for n, x in bars.items()})
+    del bars
+
+    # Pipeline completa: build, serializzazione, render, scrittura, bot
+    # Ricalcolo completo: lo stato incrementale in data_cache appartiene ai dati reali
+    market_data = b.stage('build_market_data', lambda: engine.build_market_data(df_raw, fut_h, targets, incremental=False))
+    manifest, blobs = b.stage('json_serialize', lambda: split_payload(market_data),
+                              out_bytes=lambda r: len(json.dumps(r[0], separators=(',', ':'))) + sum(len(x) for x in r[1].values()))
+    manifest['rules'] = {**rules(), 'thr': SOGLIA_DASHBOARD}
+    html = b.stage('render_html', lambda: engine.render_html(manifest), out_bytes=lambda r: len(r.encode('utf-8')))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        def written():
+            return sum(os.path.getsize(os.path.join(d, f)) for d, _, fs in os.walk(tmp) for f in fs)
+        b.stage('write_outputs', lambda: engine.write_outputs(market_data, manifest, blobs, html, tmp), out_bytes=lambda r: written())
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            b.stage('bot_report', bot.analizza_strumenti, out_bytes=lambda r: len(r.encode('utf-8')))
+        finally:
+            os.chdir(cwd)
+
+    return {
+        'commit': _git_rev(), 'python': platform.python_version(), 'machine': platform.machine(),
+        'params': {'tickers': n_tickers, 'targets': len(targets), 'years': years, 'rows': len(df_raw), 'memory': memory},
+        'total_wall_s': round(sum(s['wall_s'] for k, s in b.stages.items() if k in (
+            'build_market_data', 'json_serialize', 'render_html', 'write_outputs', 'bot_report')), 4),
+        'peak_rss_mb': round(_rss_mb(), 1),
+        'stages': b.stages,
+    }
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Benchmark pipeline Quant-Pro su dati sintetici")
+    ap.add_argument('--tickers', type=int, default=9, help="ticker totali (minimo 9: 5 target + 4 predittori)")
+    ap.add_argument('--years', type=float, default=30)
+    ap.add_argument('--seed', type=int, default=0)
+    ap.add_argument('--memory', action='store_true', help="picco allocazioni Python/NumPy per stadio (tracemalloc, più lento)")
+    ap.add_argument('--out', help="file JSON di output (default: stdout)")
+    args = ap.parse_args()
+
+    result = run(max(9, args.tickers), args.years, args.memory, args.seed)
+    text = json.dumps(result, indent=2)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            f.write(text)
+        print(f"⏱️ totale {result['total_wall_s']}s, picco RSS {result['peak_rss_mb']} MB -> {args.out}")
+    else:
+        print(text)
@@ -0,0 +1,52 @@
+# =============================================================================
+# QUANT-PRO - GENERATORE DI STORICO SINTETICO (N TICKER x M ANNI)
+# =============================================================================
+# Produce gli stessi oggetti che il motore riceve dopo il download:
+#   df_raw  colonne (Price, Ticker) come yf.download multi-ticker, indice giornaliero senza fuso
+#   fut_h   barre orarie ES=F con fuso della borsa
+# I primi ticker sono quelli di universe.json (target + predittori), gli altri SYN0001...
+
+import numpy as np
+import pandas as pd
+from universe import UNIVERSE, targets
+
+REAL_TARGETS = targets(UNIVERSE)
+PREDICTORS = list(UNIVERSE['predictors'])
+
+
+def synthetic_universe(n_tickers):
+    extra = max(0, n_tickers - len(REAL_TARGETS) - len(PREDICTORS))
+    targets = dict(REAL_TARGETS)
+    targets.update({f'SYN{i:04d}': f'SYN{i:04d}' for i in range(1, extra + 1)})
+    return targets
+
+
+def synthetic_market(n_tickers=9, years=30, seed=0, end='2026-10-16', hourly_days=60, holiday_rate=0.025):
+    rng = np.random.default_rng(seed)
+    targets = synthetic_universe(n_tickers)
+    tickers = list(targets.values()) + PREDICTORS
+    idx = pd.bdate_range(end=end, periods=int(years * 252))
+    n, k = len(idx), len(tickers)
+
+    close = 1000 * np.exp(np.cumsum(rng.normal(0, 0.011, (n, k)), axis=0))
+    vix_col = tickers.index('^VIX')
+    close[:, vix_col] = np.clip(18 + np.cumsum(rng.normal(0, 0.8, n)) * 0.1 + rng.normal(0, 2, n), 9, 80)
+    open_ = close * (1 + rng.normal(0, 0.004, (n, k)))
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.003, (n, k))))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.003, (n, k))))
+    volume = rng.integers(1e5, 1e7, (n, k)).astype('float64')
+
+    # Festività diverse per mercato e date di inizio scaglionate
+    holes = rng.random((n, k)) < holiday_rate
+    starts = rng.integers(0, max(1, n // 4), k)
+    holes |= np.arange(n)[:, None] < starts[None, :]
+    fields = {'Close': close, 'High': high, 'Low': low, 'Open': open_, 'Volume': volume}
+    df_raw = pd.concat({f: pd.DataFrame(np.where(holes, np.nan, v), index=idx, columns=tickers) for f, v in fields.items()}, axis=1)
+    df_raw.columns.names = ['Price', 'Ticker']
+
+    h_idx = pd.date_range(end=pd.Timestamp(end) + pd.Timedelta(hours=9), periods=24 * hourly_days, freq='h', tz='America/New_York')
+    h_close = 5000 * np.exp(np.cumsum(rng.normal(0, 0.002, len(h_idx))))
+    h_open = h_close * (1 + rng.normal(0, 0.001, len(h_idx)))
+    fut_h = pd.DataFrame({'Close': h_close, 'High': np.maximum(h_open, h_close) * 1.001, 'Low': np.minimum(h_open, h_close) * 0.999,
+                          'Open': h_open, 'Volume': 1e3}, index=h_idx)
+    return df_raw, fut_h, targets
@@ -1,78 +1,64 @@
 import os
-import requests
-import re
-import json
 from datetime import datetime
+from payload_codec import load_artifact
+from backtest import MOLTIPLICATORI, SOGLIA_BOT, load_rows, signals, run_backtest, yearly_pnl, trade_list
+from universe import UNIVERSE, names
+
+SEPARATORE = "───────────────────\n"
 
 def analizza_strumenti():
     try:
-        if not os.path.exists('index.html'):
-            return "File index.html non trovato."
-            
-        with open('index.html', 'r', encoding='utf-8') as f:
-            content = f.read()
-            
-        json_match = re.search(r'const data\s*=\s*({.*?});', content, re.DOTALL)
-        if not json_match:
-            return "Dati JSON non trovati."
-            
-        data = json.loads(json_match.group(1))
-        indices = data.get('indices', {})
+        artifact = load_artifact()
+        if artifact is None:
+            return "Artefatto dati non trovato (data/artifact.json)."
+        indices = artifact.get('assets', {})
         
         # --- CONFIGURAZIONE ---
-        SOGLIA = 0.7  
+        SOGLIA = SOGLIA_BOT
         DASHBOARD_URL = "https://tobiatidesca-art.github.io/dashboard/"
-        moltiplicatori = {"SX50E": 10, "DAX": 25, "FTSEMIB": 5, "CAC": 10, "IBEX": 10}
-        nomi_strumenti = {"SX50E": "EUROSTOXX 50", "DAX": "DAX 40", "FTSEMIB": "FTSE MIB 🇮🇹", "CAC": "CAC 40", "IBEX": "IBEX 35"}
+        nomi_strumenti = names(UNIVERSE)
 
         # 1. LINK IN ALTO
         report = f"🌐 *DASHBOARD LIVE:* [ACCEDI QUI]({DASHBOARD_URL})\n"
         report += "🏛 *QUANT-PRO ANNUAL REPORT*\n"
-        report += "───────────────────\n"
+        report += SEPARATORE
         
-        for key, info in indices.items():
-            history = info.get('history', [])
-            if not history: continue
-            
-            mult = moltiplicatori.get(key, 1)
-            ultima_op = history[-1]
-            data_oggi = ultima_op.get('d', datetime.now().strftime('%Y-%m-%d'))
-            m_val = ultima_op['m'] * 100
-            
-            # Segnale Live
-            if m_val > SOGLIA: segnale = "LONG 🟢"
-            elif m_val < -SOGLIA: segnale = "SHORT 🔴"
+        for key in indices:
+            rows = load_rows(artifact, key)
+            if not len(rows): continue
+
+            mult = MOLTIPLICATORI.get(key, 1)
+            ultima_op = rows[-1]
+
+            # Segnale Live (stesse regole della dashboard, VIX incluso)
+            p = signals(rows['m'][-1:], rows['v'][-1:], SOGLIA / 100)[0]
+            if p == 1: segnale = "LONG 🟢"
+            elif p == -1: segnale = "SHORT 🔴"
             else: segnale = "FLAT ⚪"
-            
+
             report += f"*{nomi_strumenti.get(key, key)}*\n"
             report += f"🎯 Segnale: {segnale}\n"
-            report += f"📍 Entry: *{ultima_op.get('in', 0):,.1f}*\n\n"
-            
-            # 2. ULTIME 2 OPERAZIONI CHIUSE
-            trade_reali = []
-            for h in reversed(history[:-1]): 
-                m_h = h['m'] * 100
-                if abs(m_h) > SOGLIA:
-                    tipo = "LONG" if m_h > SOGLIA else "SHORT"
-                    punti = (h['out'] - h['in']) if tipo == "LONG" else (h['in'] - h['out'])
-                    pnl = (punti - 2) * mult 
-                    trade_reali.append(f"• {h['d']} ({tipo}): *{pnl:,.0f}€*")
-                if len(trade_reali) == 2: break
-            
+            report += f"📍 Entry: *{float(ultima_op['in']):,.1f}*\n\n"
+
+            # 2. ULTIME 2 OPERAZIONI CHIUSE (l'ultima riga è la seduta in corso)
+            res = run_backtest(rows, SOGLIA / 100, mult)
+            trade_reali = [f"• {t['d']} ({'LONG' if t['p'] == 1 else 'SHORT'}): *{t['pnl']:,.0f}€*"
+                           for t in reversed(trade_list(rows[:-1], res, last=2))]
+
             if trade_reali:
                 report += "📊 *Ultime Operazioni:*\n" + "\n".join(trade_reali) + "\n\n"
 
+            # Monte Carlo sui trade storici già calcolato dal motore (stessa riga della dashboard): quantili 5..95
+            rischio = indices[key].get('risk', {}).get(f"{SOGLIA:.2f}")
+            if rischio and rischio['trades']:
+                eq = ["{:,.0f}".format(x).replace(",", ".") for x in rischio['final']]
+                report += f"🎲 *Monte Carlo ({rischio['sims']:,} sim):*\n".replace(",", ".")
+                report += f"• Equity finale P5–P95: *{eq[0]}€ … {eq[4]}€* (mediana {eq[2]}€)\n"
+                report += f"• Max DD P95: *{rischio['max_dd'][4]:.1f}%* | Rovina: *{rischio['ruin'] * 100:.1f}%*\n\n"
+
             # 3. TABELLA PERFORMANCE ANNUALE (COMPATTA DOPPIA COLONNA)
-            pnl_per_anno = {}
+            pnl_per_anno = yearly_pnl(rows, res)
             current_year = str(datetime.now().year)
-            
-            for h in history:
-                m_h = h['m'] * 100
-                if abs(m_h) > SOGLIA:
-                    anno = h['d'][:4] 
-                    punti = (h['out'] - h['in']) if m_h > SOGLIA else (h['in'] - h['out'])
-                    pnl = (punti - 2) * mult
-                    pnl_per_anno[anno] = pnl_per_anno.get(anno, 0) + pnl
 
             report += "📈 *PERFORMANCE STORICA:*\n"
             anni_ordinati = sorted(pnl_per_anno.keys(), reverse=True)
@@ -103,7 +89,7 @@ def analizza_strumenti():
                 
                 report += riga + "\n"
             
-            report += "───────────────────\n"
+            report += SEPARATORE
             
         return report
     except Exception as e:
@@ -111,27 +97,28 @@ def analizza_strumenti():
 
 def invia_telegram():
     token = os.getenv('TELEGRAM_TOKEN')
-    chat_id = os.getenv('TELEGRAM_CHAT_ID')
+    # Una o più chat separate da virgola
+    chat_ids = [c.strip() for c in os.getenv('TELEGRAM_CHAT_ID', '').split(',') if c.strip()]
     
-    if not token or not chat_id:
+    if not token or not chat_ids:
         print("❌ Errore: Credenziali Telegram mancanti nei Secrets.")
         return
         
     testo = analizza_strumenti()
-    url = f"https://api.telegram.org/bot{token}/sendMessage"
-    
-    payload = {
-        "chat_id": chat_id,
-        "text": testo,
-        "parse_mode": "Markdown",
-        "disable_web_page_preview": False
-    }
-    
-    response = requests.post(url, json=payload)
-    if response.status_code == 200:
-        print("✅ Report inviato con successo!")
-    else:
-        print(f"❌ Errore API Telegram: {response.text}")
+    # requests solo per l'invio: "cli.py report" stampa il report senza caricarlo
+    from notify import TelegramClient
+    client = TelegramClient(token)
+    try:
+        # Oltre 4096 caratteri: più messaggi, tagliati preferibilmente a fine sezione asset
+        esiti = client.broadcast(chat_ids, testo, seps=(SEPARATORE, "\n\n", "\n"), disable_web_page_preview=False)
+    finally:
+        client.close()
+
+    for chat_id, parti in esiti.items():
+        if parti and all(p['ok'] for p in parti):
+            print(f"✅ Report inviato con successo! (chat {chat_id}, {len(parti)} messaggi)")
+        else:
+            print(f"❌ Errore API Telegram (chat {chat_id}): {parti[-1].get('error') if parti else 'report vuoto'}")
 
 if __name__ == "__main__":
     invia_telegram()
@@ -0,0 +1,151 @@
+# =============================================================================
+# QUANT-PRO - RIGA DI COMANDO (IMPORT PESANTI SOLO NEL SOTTOCOMANDO CHE LI USA)
+# Uso: python cli.py {fetch|build|render|report|serve|bench} [opzioni]
+# =============================================================================
+#   fetch   aggiorna la cache OHLC (giornaliero di tutti i ticker + orario ES=F), niente build
+#   build   pipeline completa come "python quant_pro_engine.py" (--offline, --force)
+#   render  rigenera index.html da data/manifest.json: niente pandas, niente yfinance
+#   report  report del bot dall'artefatto in data/ (--send: invio Telegram)
+#   serve   servizio locale con API JSON (server.py)
+#   bench   benchmark della pipeline su dati sintetici; --startup: tempo di import per sottocomando
+#
+# Qui in cima solo libreria standard: ogni sottocomando importa i propri moduli.
+
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+# Moduli caricati da ogni sottocomando (misurati da "bench --startup")
+COMMAND_MODULES = {
+    'fetch': ['market_cache', 'universe'],
+    'build': ['quant_pro_engine'],
+    'render': ['render', 'payload_codec'],
+    'report': ['bot'],
+    'serve': ['server'],
+    'bench': ['benchmarks.bench_pipeline'],
+}
+HEAVY = ('numpy', 'pandas', 'yfinance', 'requests')
+
+
+def cmd_fetch(args):
+    from market_cache import refresh_cache
+    from universe import UNIVERSE, targets
+    tickers = list(targets(UNIVERSE).values()) + list(UNIVERSE['predictors'])
+    revised = {}
+    t0 = time.perf_counter()
+    if args.interval in ('1d', 'all'): refresh_cache(tickers, '1d', revisions=revised, keep=False)
+    if args.interval in ('1h', 'all'): refresh_cache(['ES=F'], '1h', revisions=revised, keep=False)
+    for tk, ts in revised.items(): print(f"♻️ {tk}: storico rivisto dal {ts:%Y-%m-%d}")
+    print(f"⏱️ fetch {time.perf_counter() - t0:.2f}s")
+
+
+def cmd_build(args):
+    import quant_pro_engine as engine
+    engine.main(offline=args.offline or engine.OFFLINE, force=args.force or engine.FORCE)
+
+
+def cmd_render(args):
+    from render import render_html
+    from payload_codec import DATA_DIR, write_if_changed
+    path = os.path.join(DATA_DIR, 'manifest.json')
+    if not os.path.exists(path):
+        print(f"❌ {path} non trovato: eseguire prima 'build'")
+        return 1
+    with open(path, encoding='utf-8') as f:
+        manifest = json.load(f)
+    page = render_html(manifest)
+    print(f"📄 index.html {'aggiornato' if write_if_changed(args.out, page) else 'invariato'} "
+          f"({len(page.encode('utf-8')) / 1024:,.0f} KB)")
+
+
+def cmd_report(args):
+    import bot
+    if args.send:
+        bot.invia_telegram()
+    else:
+        print(bot.analizza_strumenti())
+
+
+def cmd_serve(args):
+    import server
+    server.serve(args.host, args.port, args.offline, args.every, args.write)
+
+
+def startup_cost(command):
+    # In un interprete nuovo: secondi di import dei moduli del sottocomando + dipendenze pesanti caricate
+    code = ("import sys, time, json, importlib; t = time.perf_counter(); "
+            f"[importlib.import_module(m) for m in {COMMAND_MODULES[command]!r}]; "
+            "print(json.dumps({'import_s': round(time.perf_counter() - t, 4), "
+            f"'heavy': [m for m in {HEAVY!r} if m in sys.modules]}}))")
+    t0 = time.perf_counter()
+    out = subprocess.run([sys.executable, '-c', code], cwd=os.path.dirname(os.path.abspath(__file__)),
+                         capture_output=True, text=True)
+    if out.returncode: return {'error': out.stderr.strip().splitlines()[-1] if out.stderr.strip() else out.returncode}
+    return {**json.loads(out.stdout), 'process_s': round(time.perf_counter() - t0, 4)}
+
+
+def cmd_bench(args):
+    if args.startup:
+        result = {'python': sys.version.split()[0], 'startup': {c: startup_cost(c) for c in COMMAND_MODULES}}
+    else:
+        from benchmarks.bench_pipeline import run
+        result = run(max(9, args.tickers), args.years, args.memory, args.seed)
+    text = json.dumps(result, indent=2)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            f.write(text)
+        print(f"⏱️ -> {args.out}")
+    else:
+        print(text)
+
+
+def parser():
+    ap = argparse.ArgumentParser(prog='cli.py', description="Quant-Pro: dati, dashboard, report")
+    sub = ap.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('fetch', help="aggiorna la cache OHLC")
+    p.add_argument('--interval', choices=['1d', '1h', 'all'], default='all')
+    p.set_defaults(func=cmd_fetch)
+
+    p = sub.add_parser('build', help="pipeline completa (download incrementale, build, pagina)")
+    p.add_argument('--offline', action='store_true', help="solo cache locale, nessun download")
+    p.add_argument('--force', action='store_true', help="rigenera anche con input invariati")
+    p.set_defaults(func=cmd_build)
+
+    p = sub.add_parser('render', help="index.html da data/manifest.json")
+    p.add_argument('--out', default='index.html')
+    p.set_defaults(func=cmd_render)
+
+    p = sub.add_parser('report', help="report del bot dall'artefatto")
+    p.add_argument('--send', action='store_true', help="invia su Telegram invece di stampare")
+    p.set_defaults(func=cmd_report)
+
+    p = sub.add_parser('serve', help="servizio locale con API JSON")
+    p.add_argument('--host', default='127.0.0.1')
+    p.add_argument('--port', type=int, default=int(os.getenv('QUANT_PORT', '8765')))
+    p.add_argument('--every', type=float, default=float(os.getenv('QUANT_REFRESH_MIN', '15')))
+    p.add_argument('--offline', action='store_true')
+    p.add_argument('--write', action='store_true')
+    p.set_defaults(func=cmd_serve)
+
+    p = sub.add_parser('bench', help="benchmark pipeline o tempi di avvio")
+    p.add_argument('--startup', action='store_true', help="tempo di import e dipendenze pesanti per sottocomando")
+    p.add_argument('--tickers', type=int, default=9)
+    p.add_argument('--years', type=float, default=30)
+    p.add_argument('--seed', type=int, default=0)
+    p.add_argument('--memory', action='store_true')
+    p.add_argument('--out')
+    p.set_defaults(func=cmd_bench)
+    return ap
+
+
+def main(argv=None):
+    args = parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
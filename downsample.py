@@ -0,0 +1,51 @@
+# =============================================================================
+# QUANT-PRO - DOWNSAMPLING LTTB DELLE SERIE DEL GRAFICO (PER ZOOM E RISOLUZIONE)
+# =============================================================================
+# Largest-Triangle-Three-Buckets: un punto per bucket, quello che forma il triangolo
+# più grande con il punto scelto prima e la media del bucket successivo.
+# Mantiene picchi e minimi con un numero di punti fisso, indipendente dalla storia.
+#
+# La pagina sceglie la risoluzione in base alla larghezza del canvas e usa le
+# posizioni come confini di bucket anche per l'equity (vedi thinPositions nel JS).
+
+import numpy as np
+
+RESOLUTIONS = [500, 1000, 2000]
+
+
+def lttb(y, n_out):
+    # Posizioni (ordinate, prima e ultima incluse) dei punti da tenere
+    y = np.asarray(y, dtype='float64')
+    n = len(y)
+    if n_out >= n or n_out < 3: return np.arange(n)
+    every = (n - 2) / (n_out - 2)
+    edges = (np.arange(n_out - 1) * every).astype(np.int64) + 1
+    edges[-1] = n - 1
+    # Media di ogni bucket (non dipende dai punti scelti): l'ultimo "bucket" è l'ultimo punto
+    sizes = np.diff(np.append(edges, n))
+    avg_x = np.add.reduceat(np.arange(n, dtype='float64'), edges) / sizes
+    avg_y = np.add.reduceat(y, edges) / sizes
+
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        xs = np.arange(lo, hi)
+        area = np.abs((a - avg_x[i + 1]) * (y[lo:hi] - y[a]) - (a - xs) * (avg_y[i + 1] - y[a]))
+        a = lo + int(np.argmax(area))
+        out[i + 1] = a
+    return out
+
+
+def downsample_levels(y, zooms, resolutions=RESOLUTIONS):
+    # pos[r][z] = salti di indice delle posizioni LTTB nella finestra z (None se la finestra è già corta)
+    y = np.asarray(y, dtype='float64')
+    pos = []
+    for res in resolutions:
+        row = []
+        for z in zooms:
+            w = y[-z:] if z else y
+            row.append(np.diff(lttb(w, res), prepend=-1).tolist() if len(w) > res else None)
+        pos.append(row)
+    return {'res': list(resolutions), 'zoom': list(zooms), 'pos': pos}
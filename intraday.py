@@ -0,0 +1,92 @@
+# =============================================================================
+# QUANT-PRO - FINESTRA INTRADAY 00-08 CET DEL FUTURE (STORICO COMPLETO, INCREMENTALE)
+# =============================================================================
+# Per ogni giorno: apertura della barra oraria delle 00:00 -> chiusura della barra delle 08:00,
+# ora di Milano (Europe/Rome, CET/CEST con i cambi d'ora), qualunque sia il fuso della borsa.
+# Un solo passaggio vettoriale (groupby per data locale); giorni senza una delle due barre esclusi.
+#
+# La serie è la componente ES di market_transform.momentum (come fut_chg nel segnale live).
+# Salvata in data_cache/<ticker>_win.npz: a ogni run si ricalcolano solo i giorni dall'ultima
+# barra salvata meno OVERLAP['1h'] (quelli che il download orario riscrive).
+# Ricalcolo completo se cambiano fuso/finestra, se la cache oraria segnala una revisione
+# prima di quel punto, o con QUANT_REBUILD=1.
+
+import io
+import os
+import json
+import numpy as np
+import pandas as pd
+from market_cache import CACHE_DIR, OVERLAP, cache_path
+from payload_codec import write_if_changed
+
+WINDOW_TZ = 'Europe/Rome'
+WINDOW = (0, 8)
+EPOCH = pd.Timestamp('1970-01-01')
+
+
+def window_returns(bars, tz=WINDOW_TZ, window=WINDOW):
+    # Serie per data locale (senza fuso, come lo storico giornaliero): close / open - 1
+    if bars is None or bars.empty: return pd.Series(dtype='float64')
+    bars = bars[['Open', 'Close']].dropna()
+    idx = bars.index if bars.index.tz is not None else bars.index.tz_localize('UTC')
+    local = idx.tz_convert(tz)
+    start, end = window
+    hour = local.hour.to_numpy()
+    keep = (hour >= start) & (hour <= end) & (local.minute.to_numpy() == 0)
+    frame = pd.DataFrame({'h': hour[keep], 'o': bars['Open'].to_numpy()[keep], 'c': bars['Close'].to_numpy()[keep]},
+                         index=local[keep].normalize().tz_localize(None))
+    g = frame.groupby(level=0, sort=True)
+    first, last = g.first(), g.last()
+    ok = (first['h'] == start) & (last['h'] == end)
+    return (last['c'] / first['o'] - 1)[ok].rename(None)
+
+
+def _params(tz, window):
+    return json.dumps({'tz': tz, 'window': list(window)})
+
+
+def window_path(ticker):
+    return cache_path(ticker, 'win')
+
+
+def load_windows(ticker):
+    path = window_path(ticker)
+    if not os.path.exists(path): return None
+    try:
+        with np.load(path, allow_pickle=False) as z:
+            days, ret = z['day'], z['ret']
+            return str(z['params']), pd.Timestamp(int(z['last']), tz='UTC'), pd.Series(ret, index=EPOCH + pd.to_timedelta(days, 'D'))
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def save_windows(ticker, series, last, params):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    buf = io.BytesIO()
+    np.savez(buf, day=((series.index - EPOCH).days).to_numpy(dtype=np.int64), ret=series.to_numpy(dtype='float64'),
+             last=np.int64(last.value), params=np.str_(params))
+    write_if_changed(window_path(ticker), buf.getvalue())
+
+
+def update_windows(bars, ticker='ES=F', revised=None, persist=True, tz=WINDOW_TZ, window=WINDOW):
+    # Restituisce (serie su tutto lo storico orario, modalità): 'incremental' o 'rebuild'
+    if bars is None or bars.empty: return pd.Series(dtype='float64'), 'rebuild'
+    idx = bars.index if bars.index.tz is not None else bars.index.tz_localize('UTC')
+    params = _params(tz, window)
+    saved = load_windows(ticker) if persist and os.getenv('QUANT_REBUILD') != '1' else None
+
+    mode = 'rebuild'
+    if saved is not None and saved[0] == params:
+        # Dal giorno locale che il download orario può aver riscritto in poi
+        since = (saved[1] - OVERLAP['1h']).tz_convert(tz).normalize()
+        if idx[0] <= since and (revised is None or revised >= since):
+            old = saved[2][saved[2].index < since.tz_localize(None)]
+            fresh = window_returns(bars[idx >= since], tz, window)
+            series, mode = pd.concat([old, fresh]), 'incremental'
+    if mode == 'rebuild':
+        series = window_returns(bars, tz, window)
+        # Giorni già calcolati che la cache oraria (limitata a ~730 giorni) non copre più
+        if saved is not None and saved[0] == params:
+            series = pd.concat([saved[2][saved[2].index < series.index[0]] if len(series) else saved[2], series])
+    if persist: save_windows(ticker, series, idx[-1].tz_convert('UTC'), params)
+    return series, mode
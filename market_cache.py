@@ -0,0 +1,138 @@
+# =============================================================================
+# QUANT-PRO - CACHE OHLC INCREMENTALE SU DISCO (NPZ PER TICKER / INTERVALLO)
+# =============================================================================
+
+import io
+import os
+import numpy as np
+import pandas as pd
+from providers import default_provider, fetch_many, safe_name
+from payload_codec import write_if_changed
+
+CACHE_DIR = os.getenv('QUANT_CACHE_DIR', 'data_cache')
+
+# Primo download completo; dopo si scarica solo la coda dall'ultima barra in cache.
+# Yahoo limita l'orario a ~730 giorni di storico.
+INITIAL_PERIOD = {'1d': 'max', '1h': '730d'}
+# Le ultime barre vengono riscaricate per intercettare chiusure riviste/parziali.
+OVERLAP = {'1d': pd.Timedelta(days=7), '1h': pd.Timedelta(days=2)}
+
+
+def cache_path(ticker, interval):
+    return os.path.join(CACHE_DIR, f"{safe_name(ticker)}_{interval}.npz")
+
+
+def load_cached(ticker, interval):
+    path = cache_path(ticker, interval)
+    if not os.path.exists(path): return None
+    with np.load(path, allow_pickle=False) as z:
+        idx = pd.DatetimeIndex(z['index'])
+        tz = str(z['tz'])
+        if tz: idx = idx.tz_localize('UTC').tz_convert(tz)
+        cols = [str(c) for c in z['columns']]
+        return pd.DataFrame(z['values'], index=idx, columns=cols)
+
+
+def last_cached_time(ticker, interval):
+    # Solo l'ultimo timestamp (l'npz carica il singolo array index, non i valori)
+    path = cache_path(ticker, interval)
+    if not os.path.exists(path): return None
+    with np.load(path, allow_pickle=False) as z:
+        idx = z['index']
+        if not len(idx): return None
+        last = pd.Timestamp(idx[-1])
+        tz = str(z['tz'])
+    return last.tz_localize('UTC').tz_convert(tz) if tz else last
+
+
+def load_frames(tickers, interval):
+    frames = {tk: load_cached(tk, interval) for tk in tickers}
+    frames = {tk: df for tk, df in frames.items() if df is not None and not df.empty}
+    for tk in tickers:
+        if tk not in frames: print(f"⚠️ Nessuna cache {interval} per {tk}")
+    return frames
+
+
+def save_cached(ticker, interval, df):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = cache_path(ticker, interval)
+    tz = str(df.index.tz) if df.index.tz is not None else ''
+    buf = io.BytesIO()
+    np.savez(buf,
+             index=df.index.values.astype('datetime64[ns]'),
+             tz=np.array(tz),
+             columns=np.array(list(df.columns)),
+             values=df.to_numpy(dtype='float64'))
+    write_if_changed(path, buf.getvalue())
+
+
+def merge_bars(old, new):
+    # Le barre nuove vincono sulle vecchie a parità di timestamp (revisioni Yahoo)
+    if new is None or new.empty: return old
+    if old is None or old.empty: return new.sort_index()
+    # Stesso fuso della cache (i provider possono restituire UTC o il fuso della borsa)
+    if old.index.tz is not None and new.index.tz is not None: new = new.tz_convert(old.index.tz)
+    out = pd.concat([old, new])
+    out = out[~out.index.duplicated(keep='last')]
+    return out.sort_index()
+
+
+def first_revision(old, new):
+    # Prima barra già in cache che il nuovo download riporta con prezzi diversi (None se nessuna)
+    if old is None or new is None or old.empty or new.empty: return None
+    if old.index.tz is not None and new.index.tz is not None: new = new.tz_convert(old.index.tz)
+    common = old.index.intersection(new.index)
+    cols = [c for c in old.columns if c in new.columns and c != 'Volume']
+    if not len(common) or not cols: return None
+    a = old.loc[common, cols].to_numpy(dtype='float64')
+    b = new.loc[common, cols].to_numpy(dtype='float64')
+    changed = ((a != b) & ~(np.isnan(a) & np.isnan(b))).any(axis=1)
+    return common[changed][0] if changed.any() else None
+
+
+def refresh_cache(tickers, interval='1d', provider=None, timings=None, revisions=None, keep=True, batch=32):
+    # keep=False: aggiorna solo i file (il motore rilegge un asset alla volta)
+    provider = provider or default_provider()
+
+    # Ogni ticker scarica solo la propria coda (o lo storico completo se manca)
+    jobs = []
+    for tk in tickers:
+        last = last_cached_time(tk, interval)
+        if last is None:
+            jobs.append((tk, {'period': INITIAL_PERIOD.get(interval, 'max')}))
+            continue
+        if last.tzinfo is not None: last = last.tz_convert('UTC').tz_localize(None)
+        jobs.append((tk, {'start': (last - OVERLAP.get(interval, pd.Timedelta(days=7))).strftime('%Y-%m-%d')}))
+
+    # A blocchi: in memoria le barre scaricate e le cache di un solo blocco di ticker
+    out = {}
+    for k in range(0, len(jobs), batch):
+        block = dict(jobs[k:k + batch])
+        fresh, t = fetch_many(provider, block, interval)
+        if timings is not None: timings.update(t)
+        for tk in block:
+            old = load_cached(tk, interval)
+            if revisions is not None:
+                rev = first_revision(old, fresh.get(tk))
+                if rev is not None: revisions[tk] = rev
+            merged = merge_bars(old, fresh.get(tk))
+            if merged is None or merged.empty: continue
+            if tk in fresh: save_cached(tk, interval, merged)
+            if keep: out[tk] = merged
+    return out
+
+
+def assemble(frames):
+    # Stessa forma di yf.download multi-ticker: colonne (Price, Ticker)
+    if not frames: return pd.DataFrame()
+    df = pd.concat(frames, axis=1).swaplevel(0, 1, axis=1).sort_index(axis=1)
+    df.columns.names = ['Price', 'Ticker']
+    return df
+
+
+def fetch_history(tickers, interval='1d', offline=False, provider=None, timings=None, revisions=None):
+    if offline:
+        frames = load_frames(tickers, interval)
+    else:
+        frames = refresh_cache(tickers, interval, provider, timings, revisions)
+    return assemble(frames)
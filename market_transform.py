@@ -0,0 +1,80 @@
+# =============================================================================
+# QUANT-PRO - TRASFORMAZIONI COLONNARI (HISTORY / CANDELE) SENZA ITERROWS
+# =============================================================================
+
+import numpy as np
+import pandas as pd
+from payload_codec import SCALE
+from backtest import ROW_DTYPE
+
+
+def momentum(p_h, fut_win=None):
+    # Blend S&P (giorno prima), Nikkei e future ES: uguale per tutti gli asset.
+    # fut_win (intraday.update_windows): ES = finestra 00-08 CET come fut_chg nel segnale live;
+    # nei giorni senza storico orario resta la variazione giornaliera
+    es = p_h['ES=F'].pct_change()
+    if fut_win is not None and len(fut_win): es = fut_win.reindex(p_h.index).combine_first(es)
+    return (p_h['^GSPC'].pct_change().shift(1) + p_h['^N225'].pct_change() + es) / 3
+
+
+def asset_frame(bars, mom, vix):
+    # Un asset alla volta (cache o colonna del frame largo): solo Open/Close, allineati a MOM e VIX
+    temp_df = pd.DataFrame({'InP': bars['Open'], 'OutP': bars['Close']})
+    temp_df['MOM'] = mom.reindex(temp_df.index)
+    temp_df['VIX'] = vix.reindex(temp_df.index)
+    return temp_df.dropna()
+
+
+def history_records(temp_df):
+    d = temp_df.index.strftime('%Y-%m-%d').tolist()
+    m = temp_df['MOM'].to_numpy(dtype='float64').tolist()
+    v = temp_df['VIX'].to_numpy(dtype='float64').tolist()
+    i = temp_df['InP'].to_numpy(dtype='float64').tolist()
+    o = temp_df['OutP'].to_numpy(dtype='float64').tolist()
+    return [{'d': a, 'm': b, 'v': c, 'in': e, 'out': f} for a, b, c, e, f in zip(d, m, v, i, o)]
+
+
+def _fixed(values, scale):
+    return np.rint(values * scale).astype('int64').tolist()
+
+
+def history_columns(temp_df):
+    # Schema 2: array paralleli, data base + delta giorni, interi a precisione fissa
+    days = temp_df.index.values.astype('datetime64[D]').astype('int64')
+    return {
+        'base': temp_df.index[0].strftime('%Y-%m-%d') if len(temp_df) else None,
+        'cols': {
+            'dd': np.diff(days, prepend=days[:1]).tolist(),
+            'm': _fixed(temp_df['MOM'].to_numpy(dtype='float64'), SCALE['m']),
+            'v': _fixed(temp_df['VIX'].to_numpy(dtype='float64'), SCALE['v']),
+            'in': _fixed(temp_df['InP'].to_numpy(dtype='float64'), SCALE['in']),
+            'out': _fixed(temp_df['OutP'].to_numpy(dtype='float64'), SCALE['out']),
+        }
+    }
+
+
+def history_array(temp_df):
+    rows = np.empty(len(temp_df), dtype=ROW_DTYPE)
+    rows['d'] = temp_df.index.values.astype('datetime64[D]').astype('int64')
+    rows['m'] = temp_df['MOM'].to_numpy(dtype='float64')
+    rows['v'] = temp_df['VIX'].to_numpy(dtype='float64')
+    rows['in'] = temp_df['InP'].to_numpy(dtype='float64')
+    rows['out'] = temp_df['OutP'].to_numpy(dtype='float64')
+    return rows
+
+
+def rounded_rows(rows):
+    # Stessi valori che la pagina ottiene decodificando lo schema 2 (intero / scala)
+    out = rows.copy()
+    for f in ('m', 'v', 'in', 'out'):
+        out[f] = np.rint(rows[f] * SCALE[f]) / SCALE[f]
+    return out
+
+
+def candle_records(df_raw, tk, n=5):
+    try:
+        subset = df_raw.xs(tk, axis=1, level=1).dropna().tail(n)
+        cols = [subset[c].to_numpy(dtype='float64').tolist() for c in ('Open', 'High', 'Low', 'Close')]
+        d = subset.index.strftime('%d %b').tolist()
+        return [{'d': a, 'o': o, 'h': h, 'l': l, 'c': c} for a, o, h, l, c in zip(d, *cols)]
+    except: return []
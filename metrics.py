@@ -0,0 +1,96 @@
+# =============================================================================
+# QUANT-PRO - TEMPI PER STADIO E PROFILING OPZIONALE DELLA PIPELINE
+# =============================================================================
+# QUANT_PROFILE=cprofile     -> PROFILE_DIR/<stadio>.prof (apribile con pstats/snakeviz)
+# QUANT_PROFILE=tracemalloc  -> PROFILE_DIR/<stadio>.txt  (top allocazioni + picco)
+# I tempi finiscono sempre in data/metrics.json, committato insieme alla dashboard.
+
+import os
+import json
+import time
+import resource
+import contextlib
+from datetime import datetime, timezone
+from payload_codec import write_if_changed
+
+PROFILE_DIR = os.getenv('QUANT_PROFILE_DIR', 'profiles')
+
+
+def _rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _slug(name):
+    return ''.join(c if c.isalnum() or c in '-_' else '_' for c in name)
+
+
+class StageTimer:
+    def __init__(self, profile=None, profile_dir=PROFILE_DIR):
+        self.profile = profile
+        self.profile_dir = profile_dir
+        self.stages = {}
+        self.extra = {}
+        self.t0 = time.perf_counter()
+
+    @classmethod
+    def from_env(cls):
+        return cls(os.getenv('QUANT_PROFILE') or None)
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        prof = None
+        if self.profile == 'cprofile':
+            import cProfile
+            prof = cProfile.Profile()
+            prof.enable()
+        elif self.profile == 'tracemalloc':
+            import tracemalloc
+            tracemalloc.start()
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - t0
+            entry = self.stages.setdefault(name, {'wall_s': 0.0, 'calls': 0})
+            entry['wall_s'] = round(entry['wall_s'] + wall, 5)
+            entry['calls'] += 1
+            entry['peak_rss_mb'] = round(_rss_mb(), 1)
+            if prof is not None:
+                prof.disable()
+                os.makedirs(self.profile_dir, exist_ok=True)
+                prof.dump_stats(os.path.join(self.profile_dir, f"{_slug(name)}.prof"))
+            elif self.profile == 'tracemalloc':
+                import tracemalloc
+                snap = tracemalloc.take_snapshot()
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                entry['py_peak_mb'] = round(peak / 2**20, 2)
+                os.makedirs(self.profile_dir, exist_ok=True)
+                with open(os.path.join(self.profile_dir, f"{_slug(name)}.txt"), 'w', encoding='utf-8') as f:
+                    f.write(f"stadio {name}: picco {peak / 2**20:.2f} MB\n")
+                    for s in snap.statistics('lineno')[:25]:
+                        f.write(f"{s}\n")
+
+    def record(self, name, seconds):
+        # Stadio misurato altrove (es. in un processo del pool)
+        entry = self.stages.setdefault(name, {'wall_s': 0.0, 'calls': 0})
+        entry['wall_s'] = round(entry['wall_s'] + seconds, 5)
+        entry['calls'] += 1
+
+    def summary(self):
+        return {
+            'generated': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'total_s': round(time.perf_counter() - self.t0, 4),
+            'peak_rss_mb': round(_rss_mb(), 1),
+            'profile': self.profile,
+            'stages': self.stages,
+            **self.extra,
+        }
+
+    def write(self, path):
+        write_if_changed(path, json.dumps(self.summary(), indent=1))
+
+    def report(self):
+        for name, s in self.stages.items():
+            print(f"⏱️ {name:<22} {s['wall_s']:>8.3f}s")
+        print(f"⏱️ {'totale':<22} {time.perf_counter() - self.t0:>8.3f}s")
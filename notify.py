@@ -0,0 +1,146 @@
+# =============================================================================
+# QUANT-PRO - CONSEGNA TELEGRAM (SESSIONE RIUSATA, PIÙ CHAT IN PARALLELO, MESSAGGI A PEZZI)
+# =============================================================================
+# Telegram rifiuta messaggi oltre 4096 caratteri (unità UTF-16): il testo si divide prima ai
+# separatori indicati (es. fine sezione asset), poi alle righe vuote, poi a fine riga; una riga
+# troppo lunga si taglia senza lasciare aperti *, _, ` (Markdown legacy): se non c'è un punto sicuro
+# il marcatore si chiude a fine pezzo e si riapre all'inizio del successivo.
+# I pezzi di una chat partono in ordine; chat diverse in parallelo su un'unica Session (pool HTTP).
+#
+# 429: si attende parameters.retry_after (o l'header Retry-After) e si riprova;
+# errori di rete e 5xx: attesa esponenziale; altri 4xx: nessun retry (Markdown non valido ->
+# lo stesso pezzo come testo semplice).
+# TELEGRAM_API cambia l'endpoint (es. http://127.0.0.1:8081 per un server finto in locale).
+
+import os
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
+
+TELEGRAM_API = os.getenv('TELEGRAM_API', 'https://api.telegram.org')
+MAX_LEN = 4096
+MARKERS = '*_`'
+
+
+def message_len(text):
+    # Telegram conta in unità UTF-16: le emoji del report valgono 2
+    return len(text.encode('utf-16-le')) // 2
+
+
+def _open_markers(text):
+    return ''.join(m for m in MARKERS if text.count(m) % 2)
+
+
+def _hard_split(text, limit):
+    # Taglio a limit caratteri, arretrando prima di un marcatore Markdown rimasto aperto
+    chunks = []
+    while message_len(text) > limit:
+        cut = limit
+        while message_len(text[:cut]) > limit: cut -= 1
+        for m in MARKERS:
+            if text[:cut].count(m) % 2:
+                at = text.rfind(m, 0, cut)
+                if text[:at].strip(MARKERS): cut = at
+        # Marcatore aperto a inizio pezzo (nessun taglio sicuro): taglio netto, chiuso qui e riaperto nel pezzo dopo
+        opened = _open_markers(text[:cut])
+        while opened and message_len(text[:cut]) + len(opened) > limit:
+            cut -= 1
+            opened = _open_markers(text[:cut])
+        chunks.append(text[:cut] + opened[::-1])
+        text = opened + text[cut:]
+    if text: chunks.append(text)
+    return chunks
+
+
+def split_message(text, limit=MAX_LEN, seps=('\n\n', '\n')):
+    # Pezzi <= limit, riempiti il più possibile, tagliando al primo separatore che basta
+    if message_len(text) <= limit: return [text] if text.strip() else []
+    if not seps: return _hard_split(text, limit)
+    sep = seps[0]
+    parts = text.split(sep)
+    parts = [p + sep for p in parts[:-1]] + [parts[-1]]
+    chunks, cur = [], ''
+    for p in parts:
+        if not p: continue
+        if message_len(cur) + message_len(p) <= limit:
+            cur += p
+            continue
+        if cur.strip(): chunks.append(cur)
+        cur = ''
+        if message_len(p) <= limit:
+            cur = p
+        else:
+            sub = split_message(p, limit, seps[1:])
+            chunks += sub[:-1]
+            cur = sub[-1] if sub else ''
+    if cur.strip(): chunks.append(cur)
+    return chunks
+
+
+class TelegramClient:
+    def __init__(self, token, api=TELEGRAM_API, retries=5, backoff=1.0, timeout=15, pool=8, sleep=time.sleep):
+        self.url = f"{api.rstrip('/')}/bot{token}/sendMessage"
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.pool = pool
+        self.sleep = sleep
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def close(self):
+        self.session.close()
+
+    def _wait(self, r, attempt):
+        # Secondi da attendere prima del prossimo tentativo (None = non riprovare)
+        if r is None or r.status_code >= 500: return self.backoff * 2 ** (attempt - 1)
+        if r.status_code == 429:
+            try:
+                after = r.json().get('parameters', {}).get('retry_after')
+            except ValueError:
+                after = None
+            return float(after if after is not None else r.headers.get('Retry-After', self.backoff * 2 ** (attempt - 1)))
+        return None
+
+    def send(self, chat_id, text, parse_mode='Markdown', **extra):
+        # Un messaggio (<= MAX_LEN): {'ok', 'attempts', 'status', 'error'?, 'message_id'?}
+        payload = {'chat_id': chat_id, 'text': text, **extra}
+        if parse_mode: payload['parse_mode'] = parse_mode
+        for attempt in range(1, self.retries + 1):
+            r, err = None, None
+            try:
+                r = self.session.post(self.url, json=payload, timeout=self.timeout)
+            except requests.RequestException as e:
+                err = repr(e)
+            if r is not None and r.status_code == 200:
+                body = r.json()
+                return {'ok': True, 'attempts': attempt, 'status': 200, 'message_id': body.get('result', {}).get('message_id')}
+            if r is not None and err is None:
+                err = r.text[:300]
+                if r.status_code == 400 and parse_mode and "parse entities" in r.text:
+                    out = self.send(chat_id, text, parse_mode=None, **extra)
+                    out['attempts'] += attempt
+                    out['plain'] = True
+                    return out
+            wait = self._wait(r, attempt)
+            if wait is None or attempt == self.retries:
+                return {'ok': False, 'attempts': attempt, 'status': None if r is None else r.status_code, 'error': err}
+            self.sleep(wait)
+
+    def send_long(self, chat_id, text, seps=('\n\n', '\n'), **kw):
+        # Pezzi in ordine; ci si ferma al primo che fallisce (il resto non avrebbe senso da solo)
+        results = []
+        for chunk in split_message(text, MAX_LEN, seps):
+            results.append(self.send(chat_id, chunk, **kw))
+            if not results[-1]['ok']: break
+        return results
+
+    def broadcast(self, chat_ids, text, **kw):
+        # {chat_id: [esito per pezzo]}: chat in parallelo sulla stessa Session
+        if not chat_ids: return {}
+        with ThreadPoolExecutor(max_workers=min(self.pool, len(chat_ids))) as pool:
+            futures = {cid: pool.submit(self.send_long, cid, text, **kw) for cid in chat_ids}
+            return {cid: fut.result() for cid, fut in futures.items()}
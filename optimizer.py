@@ -0,0 +1,163 @@
+# =============================================================================
+# QUANT-PRO - OTTIMIZZATORE PARALLELO (SOGLIA x VIX LONG x VIX SHORT x COSTO)
+# =============================================================================
+# Lavora sullo storico già prodotto dal motore (data/artifact.json + <ASSET>.bin),
+# quindi gira offline. Le soglie sono vettorizzate in backtest.run_backtest;
+# le combinazioni di VIX/costo e gli asset sono distribuiti su un process pool.
+#
+# Uso: python optimizer.py [--train-years 5 --test-years 1] [--workers N] [--out optimizer_results.csv]
+
+import os
+import csv
+import time
+import argparse
+import itertools
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from payload_codec import DATA_DIR, load_artifact
+from backtest import GRID_THR, MOLTIPLICATORI, load_rows, run_backtest, years_of
+
+VIX_CAPS = [15, 20, 25, 30, 35, 40, 100]
+COSTS = [1, 2, 3]
+
+_ROWS = {}
+
+
+def _init(artifact, data_dir):
+    global _ROWS
+    _ROWS = {name: np.array(load_rows(artifact, name, data_dir=data_dir)) for name in artifact['assets']}
+
+
+def walk_forward_folds(days, train_years, test_years):
+    # Finestre mobili per anno solare: [train_years] di training, poi [test_years] di test
+    years = years_of(days)
+    ys = np.unique(years)
+    folds = []
+    for k in range(train_years, len(ys) - test_years + 1, test_years):
+        a, b, c = np.searchsorted(years, [ys[k - train_years], ys[k], ys[k] + test_years])
+        folds.append((slice(a, b), slice(b, c)))
+    return folds
+
+
+def _fold_stats(rows, thr, mult, cost, vix_long, vix_short):
+    res = run_backtest(rows, thr, mult, cost=cost, vix_long=vix_long, vix_short=vix_short)
+    pnl = np.where(res['traded'], res['pnl'], 0.0)
+    n = pnl.shape[-1]
+    return {
+        'profit': pnl.sum(axis=-1),
+        'gp': np.where(pnl > 0, pnl, 0.0).sum(axis=-1),
+        'gl': -np.where(res['traded'] & (pnl <= 0), pnl, 0.0).sum(axis=-1),
+        'trades': res['traded'].sum(axis=-1),
+        'max_dd': res['dd'].max(axis=-1) if n else np.zeros(len(thr)),
+    }
+
+
+def _evaluate(task):
+    # Un task = (asset, VIX long): restituisce array (vix_short, costo, fold, soglia)
+    name, vix_long, folds, thr, vix_shorts, costs = task
+    rows = _ROWS[name]
+    mult = MOLTIPLICATORI.get(name, 1)
+    shape = (len(vix_shorts), len(costs), len(folds), len(thr))
+    out = {f'{part}_{k}': np.zeros(shape) for part in ('is', 'oos') for k in ('profit', 'gp', 'gl', 'trades', 'max_dd')}
+    for (i, vs), (j, c), (f, (tr, te)) in itertools.product(enumerate(vix_shorts), enumerate(costs), enumerate(folds)):
+        for part, sl in (('is', tr), ('oos', te)):
+            if sl is None: continue
+            for k, v in _fold_stats(rows[sl], thr, mult, c, vix_long, vs).items():
+                out[f'{part}_{k}'][i, j, f] = v
+    return name, vix_long, out
+
+
+def optimize(artifact, data_dir=DATA_DIR, train_years=0, test_years=1, thr_grid=GRID_THR,
+             vix_caps=VIX_CAPS, costs=COSTS, workers=None):
+    thr = np.asarray(thr_grid, dtype='float64') / 100
+    tasks = []
+    for name in artifact['assets']:
+        rows = load_rows(artifact, name, data_dir=data_dir)
+        if train_years:
+            folds = walk_forward_folds(rows['d'], train_years, test_years)
+        else:
+            folds = [(slice(0, len(rows)), None)]
+        if not folds: continue
+        tasks += [(name, vl, folds, thr, vix_caps, costs) for vl in vix_caps]
+
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init, initargs=(artifact, data_dir)) as pool:
+        for name, vl, out in pool.map(_evaluate, tasks):
+            results.append((name, vl, out))
+    return results
+
+
+def rank(results, thr_grid=GRID_THR, vix_caps=VIX_CAPS, costs=COSTS, walk_forward=True):
+    # Classifica per asset e costo: out-of-sample (somma dei fold di test) se c'è walk-forward, altrimenti in-sample.
+    # Il costo è uno scenario, non un parametro: a parità di trade un costo più alto toglie soltanto,
+    # quindi scelta e classifica avvengono dentro ogni livello di costo.
+    part = 'oos' if walk_forward else 'is'
+    table, wf = [], {}
+    for name, vl, out in results:
+        gp, gl = out[f'{part}_gp'].sum(axis=2), out[f'{part}_gl'].sum(axis=2)
+        profit = out[f'{part}_profit'].sum(axis=2)
+        pf = np.where(gl > 0, gp / np.where(gl > 0, gl, 1), gp)
+        trades = out[f'{part}_trades'].sum(axis=2)
+        max_dd = out[f'{part}_max_dd'].max(axis=2)
+        is_profit = out['is_profit'].sum(axis=2)
+        for i, j, t in itertools.product(range(len(vix_caps)), range(len(costs)), range(len(thr_grid))):
+            table.append({'asset': name, 'thr': thr_grid[t], 'vix_long': vl, 'vix_short': vix_caps[i], 'cost': costs[j],
+                          'profit': round(float(profit[i, j, t]), 2), 'pf': round(float(pf[i, j, t]), 3),
+                          'trades': int(trades[i, j, t]), 'max_dd': round(float(max_dd[i, j, t]), 2),
+                          'is_profit': round(float(is_profit[i, j, t]), 2)})
+        if walk_forward:
+            # Per ogni costo e fold: parametri migliori sul training (VIX short x soglia) -> risultato sul test successivo
+            for j, f in itertools.product(range(len(costs)), range(out['is_profit'].shape[2])):
+                is_f, oos_f = out['is_profit'][:, j, f], out['oos_profit'][:, j, f]
+                k = np.unravel_index(np.argmax(is_f), is_f.shape)
+                best = wf.setdefault((name, costs[j], f), (-np.inf, 0.0))
+                if is_f[k] > best[0]: wf[(name, costs[j], f)] = (float(is_f[k]), float(oos_f[k]))
+
+    table.sort(key=lambda r: (r['asset'], r['cost'], -r['profit']))
+    for _, group in itertools.groupby(table, key=lambda r: (r['asset'], r['cost'])):
+        for n, r in enumerate(group, 1): r['rank'] = n
+    # wf_pnl[asset][costo] = somma OOS dei fold
+    wf_pnl = {}
+    for (name, cost, f), (_, oos) in wf.items():
+        per_cost = wf_pnl.setdefault(name, {})
+        per_cost[cost] = per_cost.get(cost, 0.0) + oos
+    return table, wf_pnl
+
+
+def write_table(table, path):
+    fields = ['asset', 'cost', 'rank', 'thr', 'vix_long', 'vix_short', 'profit', 'pf', 'trades', 'max_dd', 'is_profit']
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        w = csv.DictWriter(f, fieldnames=fields)
+        w.writeheader()
+        w.writerows(table)
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Sweep soglia / VIX / costo con walk-forward opzionale")
+    ap.add_argument('--data-dir', default=DATA_DIR)
+    ap.add_argument('--train-years', type=int, default=5, help="0 = nessun walk-forward (tutto in-sample)")
+    ap.add_argument('--test-years', type=int, default=1)
+    ap.add_argument('--workers', type=int, default=None, help="default: tutti i core")
+    ap.add_argument('--out', default='optimizer_results.csv')
+    ap.add_argument('--top', type=int, default=3)
+    args = ap.parse_args()
+
+    artifact = load_artifact(args.data_dir)
+    if artifact is None:
+        raise SystemExit(f"❌ Artefatto non trovato in {args.data_dir}: eseguire prima quant_pro_engine.py (anche --offline)")
+
+    t0 = time.perf_counter()
+    results = optimize(artifact, args.data_dir, args.train_years, args.test_years, workers=args.workers)
+    table, wf_pnl = rank(results, walk_forward=bool(args.train_years))
+    write_table(table, args.out)
+    elapsed = time.perf_counter() - t0
+
+    print(f"⚙️ {len(table):,} combinazioni in {elapsed:.2f}s ({os.cpu_count()} core) -> {args.out}")
+    label = "OOS" if args.train_years else "IS"
+    for asset, by_asset in itertools.groupby(table, key=lambda r: r['asset']):
+        print(f"*{asset}*")
+        for cost, group in itertools.groupby(by_asset, key=lambda r: r['cost']):
+            print(f"  costo {cost}" + (f"  walk-forward OOS: {wf_pnl.get(asset, {}).get(cost, 0):+,.0f}€" if args.train_years else ""))
+            for r in list(group)[:args.top]:
+                print(f"    #{r['rank']} thr {r['thr']:.2f} | VIX {r['vix_long']}/{r['vix_short']} | "
+                      f"{label} {r['profit']:+,.0f}€ PF {r['pf']:.2f} trade {r['trades']} DD {r['max_dd']:.1f}%")
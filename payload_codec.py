@@ -0,0 +1,112 @@
+# =============================================================================
+# QUANT-PRO - FORMATO PAYLOAD COLONNARE (SCHEMA VERSIONATO)
+# =============================================================================
+# indices[asset] = {
+#     'base': 'YYYY-MM-DD',          data della prima barra
+#     'cols': {'dd': [...],          giorni dalla barra precedente (il primo è 0)
+#              'm': [...], 'v': [...], 'in': [...], 'out': [...]}   interi a precisione fissa
+#     'last_price', 'entry_price',
+#     'grid': backtest.kpi_grid (KPI soglia x zoom precalcolati)
+#     'ds': downsample.downsample_levels (posizioni LTTB per risoluzione x zoom)
+#     'risk': risk.risk_grid (Monte Carlo per soglia: quantili equity finale / max DD, rovina)
+# }
+# valore reale = intero / SCALE[colonna]
+#
+# Il motore serializza ogni asset appena calcolato (asset_blob) e tiene solo 'blob' al posto di cols/grid/ds/risk.
+#
+# Su disco: DATA_DIR/manifest.json (live_preds, candele, meta asset) + DATA_DIR/<ASSET>.json
+#
+# Artefatto per il bot (senza HTML, stessi valori che la pagina decodifica: intero / SCALE):
+#     DATA_DIR/artifact.json   schema, formato record, righe e date per asset,
+#                              'risk': Monte Carlo delle soglie di default ({"0.70": riga di risk_grid})
+#     DATA_DIR/<ASSET>.bin     record little-endian a larghezza fissa RECORD
+#                              (giorni dal 1970-01-01, m, v, in, out), mappabili con
+#                              numpy (backtest.load_rows) e leggibili solo in coda
+
+import os
+import json
+import struct
+import hashlib
+from datetime import date
+
+SCHEMA = 2
+SCALE = {'m': 1000000, 'v': 100, 'in': 100, 'out': 100}
+DATA_DIR = 'data'
+
+ARTIFACT_SCHEMA = 1
+RECORD = struct.Struct('<idddd')
+RECORD_FIELDS = ('d', 'm', 'v', 'in', 'out')
+EPOCH = date(1970, 1, 1).toordinal()
+
+
+def asset_blob(info, schema=SCHEMA, scale=SCALE):
+    blob = {'schema': schema, 'scale': scale, 'base': info['base'], 'cols': info['cols']}
+    if 'grid' in info: blob['grid'] = info['grid']
+    if 'ds' in info: blob['ds'] = info['ds']
+    if 'risk' in info: blob['risk'] = info['risk']
+    return json.dumps(blob, separators=(',', ':'))
+
+
+def split_payload(market_data):
+    # manifest leggero (inline nella pagina) + un blob per asset caricato on demand.
+    # info['blob'] = blob già serializzato (il motore non tiene in memoria le colonne di tutti gli asset)
+    manifest = {k: v for k, v in market_data.items() if k != 'indices'}
+    manifest['indices'] = {}
+    assets = {}
+    for name, info in market_data['indices'].items():
+        raw = info['blob'] if 'blob' in info else asset_blob(info, market_data['schema'], market_data['scale'])
+        assets[name] = raw
+        manifest['indices'][name] = {
+            'last_price': info['last_price'], 'entry_price': info['entry_price'],
+            'file': f"{name}.json", 'v': hashlib.sha1(raw.encode('utf-8')).hexdigest()[:10]
+        }
+    return manifest, assets
+
+
+def write_if_changed(path, data):
+    # Scrittura atomica (tmp + rename) e solo se i byte cambiano: nessun diff inutile nel repo
+    if isinstance(data, str): data = data.encode('utf-8')
+    if os.path.exists(path) and os.path.getsize(path) == len(data):
+        with open(path, 'rb') as f:
+            if f.read() == data: return False
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+    return True
+
+
+def write_artifact(market_data, data_dir=DATA_DIR, changed=None):
+    # info['rows'] = array strutturato numpy con lo stesso layout di RECORD
+    changed = [] if changed is None else changed
+    assets = {}
+    for name, info in market_data['indices'].items():
+        rows = info['rows']
+        path = os.path.join(data_dir, f"{name}.bin")
+        if write_if_changed(path, rows.tobytes()): changed.append(path)
+        assets[name] = {
+            'file': f"{name}.bin", 'rows': len(rows),
+            'first': info['base'], 'last': _day(int(rows['d'][-1])) if len(rows) else None,
+            'last_price': info['last_price'], 'entry_price': info['entry_price']
+        }
+        if 'risk' in info: assets[name]['risk'] = info['risk']
+    meta = {'schema': ARTIFACT_SCHEMA, 'record': {'format': RECORD.format, 'fields': list(RECORD_FIELDS), 'epoch': '1970-01-01'},
+            'assets': assets}
+    path = os.path.join(data_dir, 'artifact.json')
+    if write_if_changed(path, json.dumps(meta, indent=1)): changed.append(path)
+    return meta
+
+
+def _day(n):
+    return date.fromordinal(EPOCH + n).isoformat()
+
+
+def load_artifact(data_dir=DATA_DIR):
+    path = os.path.join(data_dir, 'artifact.json')
+    if not os.path.exists(path): return None
+    with open(path, 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+    if meta.get('schema') != ARTIFACT_SCHEMA or meta['record']['format'] != RECORD.format:
+        raise ValueError(f"Artefatto schema {meta.get('schema')} non supportato (atteso {ARTIFACT_SCHEMA})")
+    return meta
+
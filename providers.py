@@ -0,0 +1,101 @@
+# =============================================================================
+# QUANT-PRO - PROVIDER DATI: YAHOO (CONCORRENTE, CON RETRY) E FILE LOCALI
+# =============================================================================
+# Un provider espone fetch(ticker, interval, start=None, period=None) e restituisce
+# un DataFrame OHLCV a colonne piatte (Open, High, Low, Close, Volume) o None.
+# QUANT_PROVIDER=file:<cartella> sostituisce Yahoo con fixture CSV/Parquet
+# (<cartella>/<ticker>_<intervallo>.csv|.parquet, stesso nome dei file di cache).
+
+import os
+import time
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+
+FIELDS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+
+def safe_name(ticker):
+    return ticker.replace('^', '_').replace('=', '_').replace('/', '_')
+
+
+def _clean(df, interval):
+    if df is None or df.empty: return None
+    if isinstance(df.columns, pd.MultiIndex): df.columns = df.columns.get_level_values(0)
+    df = df[[c for c in FIELDS if c in df.columns]].dropna(how='all')
+    if df.empty: return None
+    # Barre giornaliere senza fuso (come yf.download), orarie con il fuso della borsa
+    if interval == '1d' and df.index.tz is not None: df.index = df.index.tz_localize(None)
+    return df.astype('float64')
+
+
+class YahooProvider:
+    name = 'yahoo'
+
+    def __init__(self, timeout=15):
+        self.timeout = timeout
+
+    def fetch(self, ticker, interval, start=None, period=None):
+        import yfinance as yf
+        # Ticker.history è sicuro in thread paralleli, yf.download condivide stato globale
+        kw = {'start': start} if start else {'period': period or 'max'}
+        df = yf.Ticker(ticker).history(interval=interval, timeout=self.timeout, raise_errors=True, **kw)
+        return _clean(df, interval)
+
+
+class FileProvider:
+    name = 'file'
+
+    def __init__(self, root):
+        self.root = root
+
+    def fetch(self, ticker, interval, start=None, period=None):
+        base = os.path.join(self.root, f"{safe_name(ticker)}_{interval}")
+        if os.path.exists(base + '.parquet'):
+            df = pd.read_parquet(base + '.parquet')
+        elif os.path.exists(base + '.csv'):
+            df = pd.read_csv(base + '.csv', index_col=0, float_precision='round_trip')
+            # Le barre intraday con offset misti (ora legale) vengono lette in UTC
+            df.index = pd.to_datetime(df.index, utc=interval != '1d')
+        else:
+            return None
+        if start is not None:
+            ts = pd.Timestamp(start)
+            if df.index.tz is not None: ts = ts.tz_localize(df.index.tz)
+            df = df[df.index >= ts]
+        elif period and period != 'max' and period.endswith('d') and len(df):
+            df = df[df.index >= df.index[-1] - pd.Timedelta(days=int(period[:-1]))]
+        return _clean(df, interval)
+
+
+def default_provider():
+    spec = os.getenv('QUANT_PROVIDER', 'yahoo')
+    if spec.startswith('file:'): return FileProvider(spec[5:])
+    return YahooProvider()
+
+
+def fetch_with_retry(provider, ticker, interval, retries=3, backoff=1.0, **kw):
+    # Tentativi limitati con attesa esponenziale (1s, 2s, 4s...)
+    t0 = time.perf_counter()
+    for attempt in range(1, retries + 1):
+        try:
+            df = provider.fetch(ticker, interval, **kw)
+            return df, {'seconds': time.perf_counter() - t0, 'attempts': attempt, 'rows': 0 if df is None else len(df)}
+        except Exception as e:
+            if attempt == retries:
+                print(f"⚠️ {ticker} {interval}: fallito dopo {attempt} tentativi ({e})")
+                return None, {'seconds': time.perf_counter() - t0, 'attempts': attempt, 'rows': 0, 'error': str(e)}
+            time.sleep(backoff * 2 ** (attempt - 1))
+
+
+def fetch_many(provider, jobs, interval, workers=8, **retry_kw):
+    # jobs = {ticker: {'start': ...} | {'period': ...}}: un ticker lento non blocca gli altri
+    if not jobs: return {}, {}
+    frames, timings = {}, {}
+    with ThreadPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+        futures = {tk: pool.submit(fetch_with_retry, provider, tk, interval, **kw, **retry_kw) for tk, kw in jobs.items()}
+        for tk, fut in futures.items():
+            df, timings[tk] = fut.result()
+            if df is not None: frames[tk] = df
+    for tk, t in timings.items():
+        print(f"⏱️ {tk} {interval}: {t['seconds']:.2f}s, {t['rows']} barre, {t['attempts']} tentativ{'o' if t['attempts'] == 1 else 'i'}")
+    return frames, timings
@@ -3,68 +3,259 @@
 # =============================================================================
 
 import os
-import yfinance as yf
+import sys
 import pandas as pd
 import json
+import time
+import hashlib
 import warnings
 from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from market_cache import fetch_history, refresh_cache, load_frames, load_cached, assemble
+from market_transform import momentum, asset_frame, history_records, history_columns, history_array, rounded_rows, candle_records
+from payload_codec import SCHEMA, SCALE, DATA_DIR, split_payload, write_artifact, write_if_changed, asset_blob
+from backtest import MOLTIPLICATORI, GRID_ZOOM, FUT_WINDOW, SOGLIA_DASHBOARD, rules, kpi_grid
+from downsample import downsample_levels
+from risk import FOCUS_THR, risk_grid, risk_params
+from analytics_state import advance, grid_summary, load_risk, save_risk
+from intraday import update_windows
+from metrics import StageTimer
+from snapshots import snapshot_rows, append as append_snapshots, log_dir
+from universe import UNIVERSE, targets
+from render import render_html
 
 warnings.filterwarnings("ignore")
 
-def get_full_market_data():
-    targets = {
-        'SX50E': '^STOXX50E',
-        'DAX': '^GDAXI',
-        'CAC': '^FCHI',
-        'IBEX': '^IBEX',
-        'FTSEMIB': 'FTSEMIB.MI'
+# --offline (o QUANT_OFFLINE=1): nessun download, si lavora solo dalla cache locale
+OFFLINE = '--offline' in sys.argv or os.getenv('QUANT_OFFLINE') == '1'
+# --force (o QUANT_FORCE=1): rigenera anche se i dati in ingresso non sono cambiati
+FORCE = '--force' in sys.argv or os.getenv('QUANT_FORCE') == '1'
+# QUANT_PAYLOAD_REPORT=1: confronto con il vecchio formato a record (json.dumps per asset, lento su storici lunghi)
+PAYLOAD_REPORT = os.getenv('QUANT_PAYLOAD_REPORT') == '1'
+
+# QUANT_WORKERS=N: asset elaborati in N processi (default 1, in sequenza)
+WORKERS = int(os.getenv('QUANT_WORKERS', '1'))
+
+# Universo da universe.json (ticker, moltiplicatori, nomi)
+TARGETS = targets(UNIVERSE)
+PREDICTORS = list(UNIVERSE['predictors'])
+MOM_TICKERS = ('^GSPC', '^N225', 'ES=F')
+
+# Moduli che determinano l'output: cambiano il fingerprint come i dati
+BUILD_SOURCES = ('market_transform', 'payload_codec', 'backtest', 'downsample', 'intraday', 'risk', 'render',
+                 'analytics_state', 'universe')
+UNIVERSE_SOURCE = sys.modules['universe'].UNIVERSE_FILE
+
+def fetch_inputs(offline=OFFLINE, timer=None):
+    # Aggiorna la cache di tutti i ticker; in memoria restano solo i predittori (1d) e il future orario.
+    # Gli asset vengono riletti dalla cache uno alla volta in build_from_cache.
+    timer = timer or StageTimer()
+    all_tickers = list(TARGETS.values()) + PREDICTORS
+    fetch = timer.extra.setdefault('fetch', {'1d': {}, '1h': {}})
+    revised = {}
+
+    with timer.stage('download_1d'):
+        if not offline: refresh_cache(all_tickers, '1d', timings=fetch['1d'], revisions=revised, keep=False)
+        pred_raw = assemble(load_frames(PREDICTORS, '1d'))
+    with timer.stage('download_1h'):
+        revised_h = {}
+        fut_h = fetch_history(['ES=F'], '1h', offline=offline, timings=fetch['1h'], revisions=revised_h)
+    for t in list(fetch['1d'].values()) + list(fetch['1h'].values()): t['seconds'] = round(t['seconds'], 3)
+    # Barre orarie riviste: cambia la finestra 00-08 (quindi MOM) da quel giorno
+    for tk, ts in revised_h.items():
+        ts = ts.tz_convert(None) if ts.tzinfo is not None else ts
+        if tk not in revised or ts < revised[tk]: revised[tk] = ts
+    for tk, ts in revised.items(): print(f"♻️ {tk}: storico rivisto dal {ts:%Y-%m-%d}")
+    return pred_raw, fut_h, revised
+
+def get_full_market_data(offline=OFFLINE, timer=None):
+    timer = timer or StageTimer()
+    pred_raw, fut_h, revised = fetch_inputs(offline, timer)
+    return build_from_cache(pred_raw, fut_h, timer=timer, revised=revised)
+
+def _hash_frame(h, df):
+    h.update(repr(list(df.columns)).encode('utf-8'))
+    h.update(df.index.values.astype('datetime64[ns]').tobytes())
+    h.update(df.to_numpy(dtype='float64').tobytes())
+
+def input_fingerprint(fut_h, tickers=None):
+    # Hash di tutte le barre in cache (un ticker alla volta) + sorgenti del generatore;
+    # per leggibilità anche l'ultima barra per ticker
+    h = hashlib.sha1()
+    inputs = {}
+    for tk in tickers or list(TARGETS.values()) + PREDICTORS:
+        df = load_cached(tk, '1d')
+        if df is None or df.empty: continue
+        h.update(tk.encode('utf-8'))
+        _hash_frame(h, df)
+        s = df['Close'].dropna()
+        if len(s): inputs[f"{tk} 1d"] = {'last': s.index[-1].isoformat(), 'close': float(s.iloc[-1])}
+    if fut_h is not None and not fut_h.empty:
+        _hash_frame(h, fut_h)
+        s = fut_h['Close'].squeeze(axis=1) if isinstance(fut_h['Close'], pd.DataFrame) else fut_h['Close']
+        s = s.dropna()
+        if len(s): inputs["ES=F 1h"] = {'last': s.index[-1].isoformat(), 'close': float(s.iloc[-1])}
+    # Regole attive e parametri Monte Carlo (anche da variabili d'ambiente, es. QUANT_FUT_WINDOW, QUANT_MC_SIMS)
+    h.update(json.dumps(rules(), sort_keys=True).encode('utf-8'))
+    h.update(json.dumps(risk_params(), sort_keys=True).encode('utf-8'))
+    for path in [__file__, UNIVERSE_SOURCE] + [sys.modules[m].__file__ for m in BUILD_SOURCES]:
+        with open(path, 'rb') as f:
+            h.update(f.read())
+    return h.hexdigest(), inputs
+
+def load_build_info(out_dir='.'):
+    path = os.path.join(out_dir, DATA_DIR, 'build.json')
+    if not os.path.exists(path): return None
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+# Un asset: storico colonnare, righe, griglia KPI, rischio Monte Carlo, posizioni LTTB; il blob JSON è serializzato subito
+# così in memoria restano solo stringa e righe, non le liste Python di tutti gli asset.
+# incremental: KPI dell'intero storico dallo stato salvato in cache (analytics_state), non da zero
+def build_asset(name, bars, mom, vix, mult, revised_day=None, incremental=True):
+    if bars is None or bars.empty or 'Open' not in bars or 'Close' not in bars: return None
+    bars = bars[['Open', 'Close']]
+    frame = asset_frame(bars, mom, vix)
+    if frame.empty: return None
+    columns = history_columns(frame)
+    size_old = len(json.dumps(history_records(frame))) if PAYLOAD_REPORT else 0
+    size_new = len(json.dumps(columns, separators=(',', ':')))
+    # Righe arrotondate come le decodifica la pagina: griglia, journal e artefatto del bot sugli stessi valori
+    shown = rounded_rows(history_array(frame))
+    del frame
+
+    full = mode = None
+    if incremental:
+        state, mode = advance(name, shown, mult, revised_day=revised_day)
+        full = grid_summary(state)
+    columns['grid'] = kpi_grid(shown, mult, full=full)
+    columns['ds'] = downsample_levels(shown['out'], GRID_ZOOM)
+    risk_cache = load_risk(name) if incremental else None
+    columns['risk'] = risk_grid(shown, mult, cache=risk_cache, full=full)
+    if incremental: save_risk(name, risk_cache)
+    # Righe Monte Carlo delle soglie di default anche nell'artefatto: il bot le legge senza risimulare
+    risk = columns['risk']
+    risk_focus = {}
+    for t in FOCUS_THR:
+        k = risk['thr'].index(t)
+        risk_focus[f"{t:.2f}"] = {'sims': risk['sims'][k], 'trades': risk['trades'][k], 'final': risk['final'][k],
+                                  'max_dd': risk['max_dd'][k], 'ruin': risk['ruin'][k]}
+    info = {
+        'base': columns['base'],
+        'blob': asset_blob(columns, SCHEMA, SCALE),
+        'rows': shown,
+        'risk': risk_focus,
+        'last_price': float(bars['Close'].dropna().iloc[-1]),
+        'entry_price': float(bars['Open'].dropna().iloc[-1])
     }
-    predictors = ['^GSPC', '^N225', '^VIX', 'ES=F']
-    all_tickers = list(targets.values()) + predictors
+    return info, mode, size_new, size_old
 
-    df_raw = yf.download(all_tickers, period="max", progress=False)
+_MOM = _VIX = None
 
-    if isinstance(df_raw.columns, pd.MultiIndex):
-        p_h = df_raw['Close']
-        o_h = df_raw['Open']
-        h_h = df_raw['High']
-        l_h = df_raw['Low']
-    else:
-        p_h = o_h = h_h = l_h = df_raw
+def _init_worker(mom, vix):
+    global _MOM, _VIX
+    _MOM, _VIX = mom, vix
+    warnings.filterwarnings("ignore")
+
+def _asset_task(task):
+    # Nel processo del pool: l'asset si legge dalla cache qui, il padre riceve solo blob e righe
+    name, ticker, mult, revised_day, incremental = task
+    t0 = time.perf_counter()
+    out = build_asset(name, load_cached(ticker, '1d'), _MOM, _VIX, mult, revised_day, incremental)
+    return name, out, time.perf_counter() - t0
+
+# Tutto ciò che segue il download: riusabile da benchmark e test senza rete.
+# Frame largo (Price, Ticker) con predittori e asset, come yf.download
+def build_market_data(df_raw, fut_h, targets=TARGETS, timer=None, revised=None, incremental=True):
+    return _build(df_raw, fut_h, targets, lambda tk: df_raw.xs(tk, axis=1, level=1) if tk in df_raw['Close'].columns else None,
+                  timer, revised, incremental, workers=1)
+
+# Percorso del motore: predittori in memoria, asset letti dalla cache uno alla volta (o in N processi)
+def build_from_cache(pred_raw, fut_h, targets=TARGETS, timer=None, revised=None, incremental=True, workers=WORKERS):
+    return _build(pred_raw, fut_h, targets, None, timer, revised, incremental, workers)
+
+def _build(pred_raw, fut_h, targets, loader, timer, revised, incremental, workers):
+    timer = timer or StageTimer()
+    modes = timer.extra.setdefault('analytics', {})
+    p_h = pred_raw['Close']
 
     # Estrazione dati per candele (ultimi 5 giorni) con MAX e MIN
-    def get_c_data(tk):
-        try:
-            subset = df_raw.xs(tk, axis=1, level=1).dropna().tail(5)
-            return [{
-                'd': i.strftime('%d %b'), 
-                'o': float(r['Open']), 
-                'h': float(r['High']), 
-                'l': float(r['Low']), 
-                'c': float(r['Close'])
-            } for i, r in subset.iterrows()]
-        except: return []
-
-    candle_data = {'sp': get_c_data('^GSPC'), 'nk': get_c_data('^N225'), 'fut': get_c_data('ES=F')}
-
-    fut_h = yf.download('ES=F', period="5d", interval="1h", progress=False)
+    with timer.stage('candles'):
+        candle_data = {'sp': candle_records(pred_raw, '^GSPC'), 'nk': candle_records(pred_raw, '^N225'), 'fut': candle_records(pred_raw, 'ES=F')}
+
     if isinstance(fut_h.columns, pd.MultiIndex): fut_h.columns = fut_h.columns.get_level_values(0)
 
-    try:
-        f_open = fut_h.between_time('00:00', '00:00')['Open'].iloc[-1]
-        f_close = fut_h.between_time('08:00', '08:00')['Close'].iloc[-1]
-        fut_chg_win = ((f_close / f_open) - 1) * 100
-    except:
-        fut_chg_win = 0.0
+    # Finestra 00-08 CET per ogni giorno dello storico orario (incrementale come i KPI)
+    with timer.stage('intraday'):
+        rev = (revised or {}).get('ES=F')
+        fut_win, win_mode = update_windows(fut_h, 'ES=F', rev.tz_localize('UTC') if rev is not None else None, persist=incremental)
+    timer.extra['intraday'] = {'days': len(fut_win), 'mode': win_mode}
+    print(f"🕗 Finestra ES 00-08 CET: {len(fut_win)} giorni ({win_mode})")
+
+    with timer.stage('live_preds'):
+        live_preds = live_predictors(p_h, fut_win)
+    data_out = {'schema': SCHEMA, 'scale': SCALE, 'indices': {}, 'live_preds': live_preds, 'candles': candle_data}
+
+    with timer.stage('momentum'):
+        mom = momentum(p_h, fut_win if FUT_WINDOW else None)
+    vix = p_h['^VIX']
+    tasks = [(name, ticker, MOLTIPLICATORI.get(name, 1), revision_day(revised, ticker), incremental)
+             for name, ticker in targets.items()]
+
+    if loader is None and workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(mom, vix)) as pool:
+            results = list(pool.map(_asset_task, tasks))
+        for name, _, seconds in results: timer.record(f'history.{name}', seconds)
+    else:
+        results = []
+        for name, ticker, mult, revised_day, inc in tasks:
+            with timer.stage(f'history.{name}'):
+                bars = loader(ticker) if loader else load_cached(ticker, '1d')
+                results.append((name, build_asset(name, bars, mom, vix, mult, revised_day, inc), 0))
+                del bars
+
+    size_old = size_new = 0
+    for name, out, _ in results:
+        if out is None:
+            print(f"⚠️ {name}: nessuno storico utilizzabile, asset saltato")
+            continue
+        data_out['indices'][name], mode, new, old = out
+        if mode: modes[name] = mode
+        size_new += new
+        size_old += old
+
+    if modes: print("🧮 KPI storici: " + ", ".join(f"{k} {v}" for k, v in modes.items()))
+    timer.extra['history_bytes'] = size_new
+    if PAYLOAD_REPORT:
+        timer.extra['history_bytes_records'] = size_old
+        print(f"📦 Payload history: {size_old/1024:,.0f} KB (record) -> {size_new/1024:,.0f} KB (colonnare v{SCHEMA})")
+    else:
+        print(f"📦 Payload history: {size_new/1024:,.0f} KB (colonnare v{SCHEMA})")
+    return data_out
+
+def revision_day(revised, ticker):
+    # Prima barra rivista tra i ticker che entrano nelle righe dell'asset (giorni dal 1970), None se nessuna
+    hits = [ts for tk, ts in (revised or {}).items() if tk in (ticker, '^VIX', *MOM_TICKERS)]
+    if not hits: return None
+    return int((min(hits).normalize() - pd.Timestamp('1970-01-01')).days)
 
-    data_out = {'indices': {}, 'live_preds': {}, 'candles': candle_data}
+def live_predictors(p_h, fut_win):
+    # fut_win: finestra 00-08 CET per giorno (intraday.update_windows), qui serve l'ultima
+    if len(fut_win):
+        fut_chg_win = float(fut_win.iloc[-1]) * 100
+    else:
+        print("⚠️ Finestra future 00-08 non disponibile, fut_chg = 0")
+        fut_chg_win = 0.0
 
     try:
         sp_series = p_h['^GSPC'].dropna()
         nk_series = p_h['^N225'].dropna()
         vix_series = p_h['^VIX'].dropna()
 
-        data_out['live_preds'] = {
+        return {
             'sp_val': float(sp_series.iloc[-1]),
             'sp_chg': float(((sp_series.iloc[-1] / sp_series.iloc[-2]) - 1) * 100),
             'sp_dt': sp_series.index[-1].strftime('%d %b'),
@@ -74,357 +265,70 @@ def get_full_market_data():
             'fut_chg': float(fut_chg_win),
             'vix': float(vix_series.iloc[-1])
         }
-    except:
-        data_out['live_preds'] = {'sp_val':0, 'sp_chg':0, 'sp_dt':'-', 'nk_val':0, 'nk_chg':0, 'nk_dt':'-', 'fut_chg':0, 'vix':20}
-
-    for name, ticker in targets.items():
-        if ticker not in p_h.columns: continue
-        temp_df = pd.DataFrame(index=p_h.index)
-        temp_df['InP'] = o_h[ticker]
-        temp_df['OutP'] = p_h[ticker]
-        temp_df['MOM'] = (p_h['^GSPC'].pct_change().shift(1) + p_h['^N225'].pct_change() + p_h['ES=F'].pct_change()) / 3
-        temp_df['VIX'] = p_h['^VIX']
-        temp_df = temp_df.dropna()
-
-        history = []
-        for dt, row in temp_df.iterrows():
-            history.append({
-                'd': dt.strftime('%Y-%m-%d'), 'm': float(row['MOM']), 'v': float(row['VIX']),
-                'in': float(row['InP']), 'out': float(row['OutP'])
-            })
-
-        data_out['indices'][name] = {
-            'history': history,
-            'last_price': float(p_h[ticker].dropna().iloc[-1]),
-            'entry_price': float(o_h[ticker].dropna().iloc[-1])
-        }
-
-    return data_out
-
-market_data = get_full_market_data()
-
-html_template = f"""
-<!DOCTYPE html>
-<html>
-<head>
-    <meta charset="UTF-8">
-    <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css" rel="stylesheet">
-    <link href="https://fonts.googleapis.com/css2?family=Inter:wght@400;700;900&family=Roboto+Mono:wght@500;700&display=swap" rel="stylesheet">
-    <script src="https://cdn.jsdelivr.net/npm/chart.js"></script>
-    <style>
-        body {{ background: #05080a; color: #e6edf3; font-family: 'Inter', sans-serif; padding: 20px; }}
-        .header-main {{ background: linear-gradient(135deg, #0d1117 0%, #161b22 100%); border-bottom: 3px solid #238636; padding: 30px; border-radius: 15px; margin-bottom: 25px; }}
-        .card-custom {{ background: #0d1117; border: 1px solid #30363d; border-radius: 12px; padding: 20px; margin-bottom: 20px; }}
-        .val-big-label {{ font-size: 0.85rem; color: #58a6ff; font-weight: 700; text-transform: uppercase; letter-spacing: 1px; }}
-        .val-big-number {{ display: block; font-size: 2.8rem; font-family: 'Roboto Mono'; color: white; font-weight: 700; line-height: 1.1; }}
-        .ts-label {{ font-size: 0.7rem; color: #8b949e; font-family: 'Roboto Mono'; text-transform: uppercase; margin-top: 5px; }}
-        .section-tag {{ font-size: 0.7rem; background: #238636; color: white; padding: 4px 10px; border-radius: 4px; font-weight: 900; text-transform: uppercase; }}
-        .zoom-btn {{ background: #21262d; border: 1px solid #30363d; color: #8b949e; padding: 5px 12px; border-radius: 6px; font-size: 0.8rem; font-weight: 700; cursor: pointer; }}
-        .zoom-btn.active {{ background: #238636; color: white; border-color: #2ea043; }}
-        .signal-badge {{ font-size: 3.5rem; font-weight: 900; line-height: 1; }}
-        .kpi-box {{ background: #161b22; border: 1px solid #30363d; border-radius: 8px; padding: 12px; text-align: center; margin-bottom: 8px; }}
-        .explainer-box {{ font-size: 0.75rem; color: #8b949e; line-height: 1.4; border-top: 1px solid #30363d; padding-top: 15px; margin-top: 15px; }}
-        .table-scroll-container {{ max-height: 450px; overflow-y: auto; border-radius: 8px; border: 1px solid #30363d; }}
-        .table thead th {{ position: sticky; top: 0; background-color: #161b22 !important; z-index: 10; border-bottom: 2px solid #30363d; }}
-        .candle-box {{ height: 220px; }}
-        @keyframes pulse-active {{ 0% {{ opacity: 1; }} 50% {{ opacity: 0.4; }} 100% {{ opacity: 1; }} }}
-        .pulse-active {{ animation: pulse-active 1.5s infinite ease-in-out; }}
-    </style>
-</head>
-<body>
-    <div class="header-main">
-        <div class="row align-items-center">
-            <div class="col-md-3">
-                <span class="section-tag">Mod-1 Asset</span>
-                <select id="assetS" onchange="run()" class="form-select bg-primary text-white border-0 fw-bold mt-2 mb-2">
-                    <option value="SX50E">EUROSTOXX 50</option>
-                    <option value="DAX">DAX 40</option>
-                    <option value="FTSEMIB">FTSE MIB 🇮🇹</option>
-                    <option value="CAC">CAC 40</option>
-                    <option value="IBEX">IBEX 35</option>
-                </select>
-                <select id="langS" onchange="run()" class="form-select bg-dark text-white border-secondary">
-                    <option value="it" selected>Italiano 🇮🇹</option>
-                    <option value="en">English 🇬🇧</option>
-                    <option value="es">Español 🇪🇸</option>
-                    <option value="fr">Français 🇫🇷</option>
-                    <option value="de">Deutsch 🇩🇪</option>
-                    <option value="zh">中文 🇨🇳</option>
-                    <option value="ja">日本語 🇯🇵</option>
-                </select>
-            </div>
-            <div class="col-md-7 px-4">
-                <div class="row text-center">
-                    <div class="col-3 border-end border-secondary">
-                        <span class="val-big-label">S&P 500</span>
-                        <span class="val-big-number">{market_data['live_preds']['sp_val']:.0f}</span>
-                        <div class="ts-label">CLOSE: {market_data['live_preds']['sp_dt']}</div>
-                    </div>
-                    <div class="col-3 border-end border-secondary">
-                        <span class="val-big-label">NIKKEI 225</span>
-                        <span class="val-big-number">{market_data['live_preds']['nk_val']:.0f}</span>
-                        <div class="ts-label">CLOSE: {market_data['live_preds']['nk_dt']}</div>
-                    </div>
-                    <div class="col-3 border-end border-secondary">
-                        <span class="val-big-label">MOMENTUM</span>
-                        <span id="mom-val" class="val-big-number" style="color:#f1c40f">0.00%</span>
-                        <div class="ts-label">WIN: 00-08 CET</div>
-                    </div>
-                    <div class="col-3">
-                        <span class="val-big-label">SERVER TIME</span>
-                        <div id="market-clock" style="color: #f1c40f; font-family: 'Roboto Mono'; font-weight: 700; font-size: 1.3rem;">--:--:--</div>
-                    </div>
-                </div>
-            </div>
-            <div class="col-md-2 text-end">
-                <span class="val-big-label" id="t-entry">Entry Price</span>
-                <h3 id="entry-val" class="text-white fw-900 mb-0">--</h3>
-                <div id="sig-val" class="signal-badge mt-1">---</div>
-                <div id="sig-date-label" class="ts-label" style="color:#f1c40f; font-weight: 700;">DATA: --</div>
-            </div>
-        </div>
-    </div>
-
-    <div class="row g-4">
-        <div class="col-xl-3">
-            <div class="card-custom" style="height: 100%;">
-                <h6 class="val-big-label mb-3" id="t-param">Parameters</h6>
-                <div class="d-flex align-items-center mb-3">
-                    <label class="me-3 fw-bold" id="t-thr">THRESHOLD:</label>
-                    <input type="number" id="thr" class="form-control form-control-lg bg-dark text-white border-warning w-50" value="0.30" step="0.05" oninput="run()">
-                </div>
-                <div id="kpi-grid" class="row g-2 mb-3"></div>
-                <div class="explainer-box">
-                    <strong id="exp-title">A cosa serve la Soglia?</strong><br>
-                    <span id="exp-desc">--</span>
-                </div>
-            </div>
-        </div>
-        <div class="col-xl-9">
-            <div class="card-custom">
-                <div class="d-flex justify-content-between align-items-center">
-                    <span class="section-tag">Performance</span>
-                    <div class="btn-group">
-                        <button class="zoom-btn" onclick="setZoom(this, 22)">1M</button>
-                        <button class="zoom-btn" onclick="setZoom(this, 66)">3M</button>
-                        <button class="zoom-btn" onclick="setZoom(this, 252)">1Y</button>
-                        <button class="zoom-btn" onclick="setZoom(this, 504)">2Y</button>
-                        <button class="zoom-btn active" onclick="setZoom(this, 0)">MAX</button>
-                    </div>
-                </div>
-                <div style="height: 400px;" class="mt-3"><canvas id="chart"></canvas></div>
-            </div>
-        </div>
-    </div>
-
-    <div class="card-custom mt-4">
-        <span class="section-tag">Journal (Full History)</span>
-        <div class="table-scroll-container mt-3">
-            <table class="table table-dark table-hover m-0">
-                <thead><tr id="table-head"></tr></thead>
-                <tbody id="auditBody"></tbody>
-            </table>
-        </div>
-    </div>
-
-    <div class="row g-4 mt-2">
-        <div class="col-md-4">
-            <div class="card-custom text-center">
-                <span class="val-big-label">S&P 500 (5D OHLC)</span>
-                <div class="candle-box mt-2"><canvas id="cSP"></canvas></div>
-            </div>
-        </div>
-        <div class="col-md-4">
-            <div class="card-custom text-center">
-                <span class="val-big-label">NIKKEI 225 (5D OHLC)</span>
-                <div class="candle-box mt-2"><canvas id="cNK"></canvas></div>
-            </div>
-        </div>
-        <div class="col-md-4">
-            <div class="card-custom text-center">
-                <span class="val-big-label">S&P FUTURE (5D OHLC)</span>
-                <div class="candle-box mt-2"><canvas id="cFUT"></canvas></div>
-            </div>
-        </div>
-    </div>
-
-    <script>
-        const data = {json.dumps(market_data)};
-        let myChart = null;
-        let cCharts = {{}};
-        let currentZoom = 0;
-
-        const i18n = {{
-            en: {{
-                entry:"Entry", sigTime: "SIGNAL AT 09:00 CET", param: "Parameters",
-                expT: "What is Threshold?",
-                expD: "Determines signal sensitivity. Increase it to filter noise, decrease it to be aggressive.",
-                kpi:["Profit", "Win Rate", "Trades", "Max DD", "PF"], sig:["FLAT","LONG","SHORT"], cols:["DATE","TYPE","IN","OUT","PTS","PNL"]
-            }},
-            it: {{
-                entry:"Ingresso", sigTime: "SEGNALE ORE 09:00 CET", param: "Parametri",
-                expT: "A cosa serve la Soglia?",
-                expD: "Determina la sensibilità del segnale. Aumentala per filtrare il rumore, diminuiscila per essere più aggressivo.",
-                kpi:["Profitto", "Win Rate", "Trade", "Max DD", "PF"], sig:["FLAT","LONG","SHORT"], cols:["DATA","TIPO","IN","OUT","PTI","PNL"]
-            }},
-            es: {{ entry:"Entrada", sigTime: "SEÑAL A LAS 09:00 CET", param: "Parámetros", expT: "¿Qué ès el Umbral?", expD: "Determina la sensibilidad de la señal.", kpi:["Beneficio", "Ganas", "Operaciones", "Max DD", "PF"], sig:["FLAT","LONG","SHORT"], cols:["FECHA","TIPO","IN","OUT","PTS","PNL"] }},
-            fr: {{ entry:"Entrée", sigTime: "SIGNAL À 09:00 CET", param: "Paramètres", expT: "C'est quoi le Seuil?", expD: "Détermine la sensibilité du signal.", kpi:["Profit", "Win Rate", "Trades", "Max DD", "PF"], sig:["FLAT","LONG","SHORT"], cols:["DATE","TYPE","IN","OUT","PTS","PNL"] }},
-            de: {{ entry:"Einstieg", sigTime: "SIGNAL UM 09:00 CET", param: "Parameter", expT: "Was ist der Schwellenwert?", expD: "Bestimmt die Signalempfindlichkeit.", kpi:["Gewinn", "Win Rate", "Trades", "Max DD", "PF"], sig:["FLAT","LONG","SHORT"], cols:["DATUM","TYP","IN","OUT","PKT","PNL"] }},
-            zh: {{ entry:"入场价格", sigTime: "信号时间 09:00 CET", param: "参数设置", expT: "什么是阈值？", expD: "决定信号灵敏度。", kpi:["利润", "胜率", "交易次数", "最大回撤", "PF"], sig:["平仓","做多","做空"], cols:["日期","类型","入场","出场","点数","盈亏"] }},
-            ja: {{ entry:"エントリー", sigTime: "信号 09:00 CET", param: "パラメーター", expT: "しきい値とは？", expD: "信号の感度を決定します。", kpi:["利益", "勝率", "取引数", "最大ドローダウン", "PF"], sig:["フラット","ロング","ショート"], cols:["日付","タイプ","入","出","ポイント","損益"] }}
-        }};
-
-        function setZoom(btn, days) {{
-            currentZoom = days;
-            document.querySelectorAll('.zoom-btn').forEach(b => b.classList.remove('active'));
-            btn.classList.add('active');
-            run();
-        }}
-
-        function updateClock() {{
-            const now = new Date();
-            document.getElementById('market-clock').innerText = now.toLocaleString("it-IT", {{timeZone:"Europe/Berlin", hour:'2-digit', minute:'2-digit', second:'2-digit'}}) + " CET";
-        }}
-        setInterval(updateClock, 1000);
-
-        // FUNZIONE PER DISEGNARE CANDELABRI PROFESSIONALI (CORPO + OMBRE)
-        function drawCandle(cid, cdata) {{
-            if(cCharts[cid]) cCharts[cid].destroy();
-            cCharts[cid] = new Chart(document.getElementById(cid), {{
-                type: 'bar',
-                data: {{
-                    labels: cdata.map(x => x.d),
-                    datasets: [
-                        {{
-                            label: 'Wick',
-                            data: cdata.map(x => [x.l, x.h]),
-                            backgroundColor: '#444',
-                            barPercentage: 0.05,
-                            grouped: false
-                        }},
-                        {{
-                            label: 'Body',
-                            data: cdata.map(x => [x.o, x.c]),
-                            backgroundColor: cdata.map(x => x.c >= x.o ? '#238636' : '#da3633'),
-                            barPercentage: 0.6,
-                            grouped: false
-                        }}
-                    ]
-                }},
-                options: {{
-                    responsive: true, maintainAspectRatio: false,
-                    plugins: {{ legend: {{ display: false }}, tooltip: {{ enabled: true }} }},
-                    scales: {{ 
-                        y: {{ beginAtZero: false, grid: {{ color: '#161b22' }}, ticks: {{ color: '#8b949e', font: {{ size: 9 }} }} }},
-                        x: {{ grid: {{ display: false }}, ticks: {{ color: '#8b949e', font: {{ size: 9 }} }} }}
-                    }}
-                }}
-            }});
-        }}
-
-        function run() {{
-            const asset = document.getElementById('assetS').value;
-            const lang = document.getElementById('langS').value;
-            const t = i18n[lang] || i18n['en'];
-            const thr = parseFloat(document.getElementById('thr').value) / 100;
-            const assetData = data.indices[asset];
-            const preds = data.live_preds;
-
-            const historyFull = assetData.history;
-            const lastDate = historyFull[historyFull.length - 1].d;
-            document.getElementById('sig-date-label').innerText = "REF DATE: " + lastDate;
-
-            const todayStr = new Date().toISOString().split('T')[0];
-            const isLive = (lastDate === todayStr);
-
-            document.getElementById('table-head').innerHTML = t.cols.map(c => `<th>${{c}}</th>`).join('');
-            document.getElementById('t-entry').innerText = t.entry;
-            document.getElementById('t-param').innerText = t.param;
-            document.getElementById('exp-title').innerText = t.expT;
-            document.getElementById('exp-desc').innerText = t.expD;
-            document.getElementById('entry-val').innerText = "€ " + assetData.entry_price.toFixed(1);
-
-            const momLive = (preds.sp_chg + preds.nk_chg + preds.fut_chg) / 300;
-            document.getElementById('mom-val').innerText = (momLive*100).toFixed(2) + "%";
-
-            let sig = t.sig[0] + " ⚪"; let col = "#8b949e";
-            let sigElement = document.getElementById('sig-val');
-            sigElement.classList.remove('pulse-active');
-
-            if (momLive > thr && preds.vix < 25) {{ 
-                sig = t.sig[1] + " 🟢"; col = "#238636"; 
-                if(isLive) sigElement.classList.add('pulse-active');
-            }}
-            else if (momLive < -thr && preds.vix < 32) {{ 
-                sig = t.sig[2] + " 🔴"; col = "#da3633"; 
-                if(isLive) sigElement.classList.add('pulse-active');
-            }}
-            sigElement.innerText = sig; sigElement.style.color = col;
-
-            let cap = 20000, wins = 0, total = 0, mdd = 0, maxC = 20000, gP = 0, gL = 0;
-            let mult = (asset === 'DAX' ? 25 : (asset === 'FTSEMIB' ? 5 : 10));
-
-            let history = assetData.history;
-            if(currentZoom > 0) history = history.slice(-currentZoom);
-
-            let eqD = [], lbl = [], idxD = [], rows = [];
-            history.forEach(h => {{
-                let p = 0;
-                if (h.m > thr && h.v < 25) p = 1; else if (h.m < -thr && h.v < 32) p = -1;
-                if (p !== 0) {{
-                    total++;
-                    let pts = (p === 1) ? (h.out - h.in - 2) : (h.in - h.out - 2);
-                    let pnl = pts * mult;
-                    cap += pnl;
-                    if (pnl > 0) {{ wins++; gP += pnl; }} else {{ gL += Math.abs(pnl); }}
-                    rows.push({{ d: h.d, t: p==1?t.sig[1]:t.sig[2], in: h.in, out: h.out, pts: pts, pnl: pnl }});
-                }}
-                eqD.push(cap); lbl.push(h.d); idxD.push(h.out);
-                if (cap > maxC) maxC = cap;
-                let dd = ((maxC - cap)/maxC)*100; if(dd > mdd) mdd = dd;
-            }});
-
-            const pf = gL === 0 ? gP.toFixed(2) : (gP/gL).toFixed(2);
-            document.getElementById('kpi-grid').innerHTML = `
-                <div class="col-6"><div class="kpi-box"><div class="val-big-label">${{t.kpi[0]}}</div><div class="text-success fw-bold">${{(cap-20000).toLocaleString()}}€</div></div></div>
-                <div class="col-6"><div class="kpi-box"><div class="val-big-label">${{t.kpi[1]}}</div><div class="text-info fw-bold">${{total?((wins/total)*100).toFixed(1):0}}%</div></div></div>
-                <div class="col-12"><div class="kpi-box border-warning"><div class="val-big-label" style="color:#f1c40f">${{t.kpi[4]}}</div><div class="fw-bold" style="color:#f1c40f">${{pf}}</div></div></div>
-            `;
-
-            document.getElementById('auditBody').innerHTML = rows.reverse().map(r => `
-                <tr><td>${{r.d}}</td><td class="fw-bold">${{r.t}}</td><td>${{r.in.toFixed(1)}}</td><td>${{r.out.toFixed(1)}}</td>
-                <td class="${{r.pts>=0?'text-success':'text-danger'}}">${{r.pts.toFixed(1)}}</td><td class="fw-bold">${{Math.round(r.pnl)}}€</td></tr>
-            `).join('');
-
-            if (myChart) myChart.destroy();
-            myChart = new Chart(document.getElementById('chart'), {{
-                data: {{ labels: lbl, datasets: [
-                    {{ type: 'line', label: 'Equity', data: eqD, borderColor: '#238636', borderWidth: 2.5, pointRadius: 0, yAxisID: 'y' }},
-                    {{ type: 'line', label: asset, data: idxD, borderColor: 'rgba(241, 196, 15, 0.4)', borderWidth: 1.5, pointRadius: 0, yAxisID: 'y1' }}
-                ]}},
-                options: {{
-                    responsive: true, maintainAspectRatio: false, animation: false,
-                    scales: {{
-                        x: {{ ticks: {{ color: '#8b949e', maxTicksLimit: 10 }}, grid: {{ color: '#161b22' }} }},
-                        y: {{ position: 'left', ticks: {{ color: '#238636' }}, grid: {{ color: '#30363d' }} }},
-                        y1: {{ position: 'right', ticks: {{ color: '#f1c40f' }}, grid: {{ display: false }} }}
-                    }},
-                    plugins: {{ legend: {{ display: false }} }}
-                }}
-            }});
-
-            // Render Candele Real OHLC
-            drawCandle('cSP', data.candles.sp);
-            drawCandle('cNK', data.candles.nk);
-            drawCandle('cFUT', data.candles.fut);
-        }}
-        window.onload = () => {{ updateClock(); run(); }};
-    </script>
-</body>
-</html>
-"""
-
-with open("index.html", "w", encoding="utf-8") as f:
-    f.write(html_template)
-
-print("Quant-Pro V8.4.0 generata con successo!")
+    except Exception as e:
+        print(f"⚠️ Predittori live non disponibili, valori di default ({e!r})")
+        return {'sp_val':0, 'sp_chg':0, 'sp_dt':'-', 'nk_val':0, 'nk_chg':0, 'nk_dt':'-', 'fut_chg':0, 'vix':20}
+
+# Ogni file è scritto in modo atomico e solo se i byte cambiano; restituisce i percorsi modificati
+def write_outputs(market_data, manifest, asset_blobs, html, out_dir='.', build=None):
+    data_dir = os.path.join(out_dir, DATA_DIR)
+    os.makedirs(data_dir, exist_ok=True)
+    files = {os.path.join(data_dir, "manifest.json"): json.dumps(manifest, separators=(',', ':'))}
+    for name, raw in asset_blobs.items():
+        files[os.path.join(data_dir, f"{name}.json")] = raw
+    changed = [path for path, raw in files.items() if write_if_changed(path, raw)]
+    write_artifact(market_data, data_dir, changed)
+    # Log append-only di ciò che la pagina mostra in questo run (snapshots.py)
+    if append_snapshots(snapshot_rows(manifest, market_data), data_dir): changed.append(log_dir(data_dir))
+
+    path = os.path.join(out_dir, "index.html")
+    if write_if_changed(path, html): changed.append(path)
+    # Fingerprint per ultimo: se la scrittura si interrompe, il run successivo rigenera
+    if build is not None:
+        path = os.path.join(data_dir, "build.json")
+        if write_if_changed(path, json.dumps(build, indent=1)): changed.append(path)
+    return changed
+
+def generate(offline=OFFLINE, timer=None, skip_fingerprint=None):
+    # Download + build + serializzazione + HTML, senza scrivere nulla (usato da main e da server.py).
+    # None se il fingerprint degli input coincide con skip_fingerprint
+    timer = timer or StageTimer()
+    pred_raw, fut_h, revised = fetch_inputs(offline, timer)
+    with timer.stage('fingerprint'):
+        fingerprint, inputs = input_fingerprint(fut_h)
+    if skip_fingerprint == fingerprint: return None
+
+    market_data = build_from_cache(pred_raw, fut_h, timer=timer, revised=revised)
+    del pred_raw, fut_h
+    with timer.stage('json_serialize'):
+        manifest, asset_blobs = split_payload(market_data)
+        manifest['rules'] = {**rules(), 'thr': SOGLIA_DASHBOARD}
+    with timer.stage('render_html'):
+        html_template = render_html(manifest)
+    timer.extra['html_bytes'] = len(html_template.encode('utf-8'))
+    timer.extra['asset_bytes'] = {name: len(raw) for name, raw in asset_blobs.items()}
+    return {'market_data': market_data, 'manifest': manifest, 'asset_blobs': asset_blobs, 'html': html_template,
+            'build': {'fingerprint': fingerprint, 'inputs': inputs}}
+
+def main(offline=OFFLINE, force=FORCE):
+    # QUANT_PROFILE=cprofile|tracemalloc: profilo per stadio in profiles/ (vedi metrics.py)
+    timer = StageTimer.from_env()
+    prev = None if force else load_build_info()
+    out = generate(offline, timer, skip_fingerprint=prev and prev.get('fingerprint'))
+    if out is None:
+        print(f"⏭️ Dati invariati (fingerprint {prev['fingerprint'][:12]}): nessuna rigenerazione, nessun file scritto")
+        return
+
+    html_template, asset_blobs = out['html'], out['asset_blobs']
+    with timer.stage('write_outputs'):
+        changed = write_outputs(out['market_data'], out['manifest'], asset_blobs, html_template, build=out['build'])
+    print(f"💾 File aggiornati: {len(changed)}" + (f" ({', '.join(os.path.basename(p) for p in changed)})" if changed else ""))
+    timer.write(os.path.join(DATA_DIR, 'metrics.json'))
+    timer.report()
+
+    print(f"📄 index.html: {len(html_template.encode('utf-8'))/1024:,.0f} KB + {len(asset_blobs)} file asset on demand "
+          f"({sum(len(r) for r in asset_blobs.values())/1024:,.0f} KB totali)")
+    print("Quant-Pro V8.4.0 generata con successo!")
+
+if __name__ == "__main__":
+    main()
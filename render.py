@@ -0,0 +1,556 @@
+# =============================================================================
+# QUANT-PRO - PAGINA HTML DAL MANIFEST (SENZA PANDAS NÉ DOWNLOAD)
+# =============================================================================
+# render_html(manifest) è tutto ciò che serve per rigenerare index.html: il motore lo chiama
+# dopo il build, "python cli.py render" dal data/manifest.json già scritto.
+
+import json
+import html
+from payload_codec import DATA_DIR
+from universe import UNIVERSE, names
+
+
+def asset_options(manifest):
+    label = names(UNIVERSE)
+    return "\n                    ".join(f'<option value="{html.escape(k)}">{html.escape(label.get(k, k))}</option>' for k in manifest['indices'])
+
+
+def render_html(manifest):
+    return f"""
+<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="UTF-8">
+    <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css" rel="stylesheet">
+    <link href="https://fonts.googleapis.com/css2?family=Inter:wght@400;700;900&family=Roboto+Mono:wght@500;700&display=swap" rel="stylesheet">
+    <script src="https://cdn.jsdelivr.net/npm/chart.js"></script>
+    <style>
+        body {{ background: #05080a; color: #e6edf3; font-family: 'Inter', sans-serif; padding: 20px; }}
+        .header-main {{ background: linear-gradient(135deg, #0d1117 0%, #161b22 100%); border-bottom: 3px solid #238636; padding: 30px; border-radius: 15px; margin-bottom: 25px; }}
+        .card-custom {{ background: #0d1117; border: 1px solid #30363d; border-radius: 12px; padding: 20px; margin-bottom: 20px; }}
+        .val-big-label {{ font-size: 0.85rem; color: #58a6ff; font-weight: 700; text-transform: uppercase; letter-spacing: 1px; }}
+        .val-big-number {{ display: block; font-size: 2.8rem; font-family: 'Roboto Mono'; color: white; font-weight: 700; line-height: 1.1; }}
+        .ts-label {{ font-size: 0.7rem; color: #8b949e; font-family: 'Roboto Mono'; text-transform: uppercase; margin-top: 5px; }}
+        .section-tag {{ font-size: 0.7rem; background: #238636; color: white; padding: 4px 10px; border-radius: 4px; font-weight: 900; text-transform: uppercase; }}
+        .zoom-btn {{ background: #21262d; border: 1px solid #30363d; color: #8b949e; padding: 5px 12px; border-radius: 6px; font-size: 0.8rem; font-weight: 700; cursor: pointer; }}
+        .zoom-btn.active {{ background: #238636; color: white; border-color: #2ea043; }}
+        .signal-badge {{ font-size: 3.5rem; font-weight: 900; line-height: 1; }}
+        .kpi-box {{ background: #161b22; border: 1px solid #30363d; border-radius: 8px; padding: 12px; text-align: center; margin-bottom: 8px; }}
+        .explainer-box {{ font-size: 0.75rem; color: #8b949e; line-height: 1.4; border-top: 1px solid #30363d; padding-top: 15px; margin-top: 15px; }}
+        .table-scroll-container {{ max-height: 450px; overflow-y: auto; border-radius: 8px; border: 1px solid #30363d; }}
+        #auditBody tr.jr td {{ height: 37px; padding-top: 0; padding-bottom: 0; vertical-align: middle; white-space: nowrap; }}
+        #auditBody tr.jr-year td {{ background: #161b22; color: #58a6ff; }}
+        .table thead th {{ position: sticky; top: 0; background-color: #161b22 !important; z-index: 10; border-bottom: 2px solid #30363d; }}
+        .candle-box {{ height: 220px; }}
+        @keyframes pulse-active {{ 0% {{ opacity: 1; }} 50% {{ opacity: 0.4; }} 100% {{ opacity: 1; }} }}
+        .pulse-active {{ animation: pulse-active 1.5s infinite ease-in-out; }}
+    </style>
+</head>
+<body>
+    <div class="header-main">
+        <div class="row align-items-center">
+            <div class="col-md-3">
+                <span class="section-tag">Mod-1 Asset</span>
+                <select id="assetS" onchange="run()" class="form-select bg-primary text-white border-0 fw-bold mt-2 mb-2">
+                    {asset_options(manifest)}
+                </select>
+                <select id="langS" onchange="run()" class="form-select bg-dark text-white border-secondary">
+                    <option value="it" selected>Italiano 🇮🇹</option>
+                    <option value="en">English 🇬🇧</option>
+                    <option value="es">Español 🇪🇸</option>
+                    <option value="fr">Français 🇫🇷</option>
+                    <option value="de">Deutsch 🇩🇪</option>
+                    <option value="zh">中文 🇨🇳</option>
+                    <option value="ja">日本語 🇯🇵</option>
+                </select>
+            </div>
+            <div class="col-md-7 px-4">
+                <div class="row text-center">
+                    <div class="col-3 border-end border-secondary">
+                        <span class="val-big-label">S&P 500</span>
+                        <span class="val-big-number">{manifest['live_preds']['sp_val']:.0f}</span>
+                        <div class="ts-label">CLOSE: {manifest['live_preds']['sp_dt']}</div>
+                    </div>
+                    <div class="col-3 border-end border-secondary">
+                        <span class="val-big-label">NIKKEI 225</span>
+                        <span class="val-big-number">{manifest['live_preds']['nk_val']:.0f}</span>
+                        <div class="ts-label">CLOSE: {manifest['live_preds']['nk_dt']}</div>
+                    </div>
+                    <div class="col-3 border-end border-secondary">
+                        <span class="val-big-label">MOMENTUM</span>
+                        <span id="mom-val" class="val-big-number" style="color:#f1c40f">0.00%</span>
+                        <div class="ts-label">WIN: 00-08 CET</div>
+                    </div>
+                    <div class="col-3">
+                        <span class="val-big-label">SERVER TIME</span>
+                        <div id="market-clock" style="color: #f1c40f; font-family: 'Roboto Mono'; font-weight: 700; font-size: 1.3rem;">--:--:--</div>
+                    </div>
+                </div>
+            </div>
+            <div class="col-md-2 text-end">
+                <span class="val-big-label" id="t-entry">Entry Price</span>
+                <h3 id="entry-val" class="text-white fw-900 mb-0">--</h3>
+                <div id="sig-val" class="signal-badge mt-1">---</div>
+                <div id="sig-date-label" class="ts-label" style="color:#f1c40f; font-weight: 700;">DATA: --</div>
+            </div>
+        </div>
+    </div>
+
+    <div class="row g-4">
+        <div class="col-xl-3">
+            <div class="card-custom" style="height: 100%;">
+                <h6 class="val-big-label mb-3" id="t-param">Parameters</h6>
+                <div class="d-flex align-items-center mb-3">
+                    <label class="me-3 fw-bold" id="t-thr">THRESHOLD:</label>
+                    <input type="number" id="thr" class="form-control form-control-lg bg-dark text-white border-warning w-50" value="{manifest['rules']['thr']:.2f}" step="0.05" oninput="schedule()">
+                </div>
+                <div id="kpi-grid" class="row g-2 mb-3"></div>
+                <div class="explainer-box">
+                    <strong id="exp-title">A cosa serve la Soglia?</strong><br>
+                    <span id="exp-desc">--</span>
+                </div>
+            </div>
+        </div>
+        <div class="col-xl-9">
+            <div class="card-custom">
+                <div class="d-flex justify-content-between align-items-center">
+                    <span class="section-tag">Performance</span>
+                    <div class="btn-group">
+                        <button class="zoom-btn" onclick="setZoom(this, 22)">1M</button>
+                        <button class="zoom-btn" onclick="setZoom(this, 66)">3M</button>
+                        <button class="zoom-btn" onclick="setZoom(this, 252)">1Y</button>
+                        <button class="zoom-btn" onclick="setZoom(this, 504)">2Y</button>
+                        <button class="zoom-btn active" onclick="setZoom(this, 0)">MAX</button>
+                        <button class="zoom-btn ms-2" onclick="exportCsv()" title="Equity e indice a piena risoluzione">CSV</button>
+                    </div>
+                </div>
+                <div style="height: 400px;" class="mt-3"><canvas id="chart"></canvas></div>
+            </div>
+        </div>
+    </div>
+
+    <div class="card-custom mt-4">
+        <span class="section-tag">Journal (Full History)</span>
+        <div id="journal-box" class="table-scroll-container mt-3">
+            <table class="table table-dark table-hover m-0">
+                <thead><tr id="table-head"></tr></thead>
+                <tbody id="auditBody"></tbody>
+            </table>
+        </div>
+    </div>
+
+    <div class="row g-4 mt-2">
+        <div class="col-md-4">
+            <div class="card-custom text-center">
+                <span class="val-big-label">S&P 500 (5D OHLC)</span>
+                <div class="candle-box mt-2"><canvas id="cSP"></canvas></div>
+            </div>
+        </div>
+        <div class="col-md-4">
+            <div class="card-custom text-center">
+                <span class="val-big-label">NIKKEI 225 (5D OHLC)</span>
+                <div class="candle-box mt-2"><canvas id="cNK"></canvas></div>
+            </div>
+        </div>
+        <div class="col-md-4">
+            <div class="card-custom text-center">
+                <span class="val-big-label">S&P FUTURE (5D OHLC)</span>
+                <div class="candle-box mt-2"><canvas id="cFUT"></canvas></div>
+            </div>
+        </div>
+    </div>
+
+    <script>
+        const data = {json.dumps(manifest, separators=(',', ':'))};
+        // ?api=http://127.0.0.1:8765 : manifest e asset dal servizio locale (server.py) invece che da {DATA_DIR}/
+        const API = (new URLSearchParams(location.search).get('api') || '').replace(/[/]+$/, '');
+        const assetCache = {{}};
+        let runSeq = 0;
+        let pending = false;
+        let myChart = null;
+        let cCharts = {{}};
+        let currentZoom = 0;
+        let chartLabels = [];
+        let fullSeries = null;
+        let journal = [];
+        let journalPending = false;
+        const JOURNAL_ROW = 37;
+
+        const i18n = {{
+            en: {{
+                entry:"Entry", sigTime: "SIGNAL AT 09:00 CET", param: "Parameters",
+                expT: "What is Threshold?",
+                expD: "Determines signal sensitivity. Increase it to filter noise, decrease it to be aggressive.",
+                kpi:["Profit", "Win Rate", "Trades", "Max DD", "PF"], sig:["FLAT","LONG","SHORT"], cols:["DATE","TYPE","IN","OUT","PTS","PNL"],
+                mc:["Monte Carlo risk", "Final equity P5–P95", "Median equity", "Max DD P95", "Risk of ruin"]
+            }},
+            it: {{
+                entry:"Ingresso", sigTime: "SEGNALE ORE 09:00 CET", param: "Parametri",
+                expT: "A cosa serve la Soglia?",
+                expD: "Determina la sensibilità del segnale. Aumentala per filtrare il rumore, diminuiscila per essere più aggressivo.",
+                kpi:["Profitto", "Win Rate", "Trade", "Max DD", "PF"], sig:["FLAT","LONG","SHORT"], cols:["DATA","TIPO","IN","OUT","PTI","PNL"],
+                mc:["Rischio Monte Carlo", "Equity finale P5–P95", "Equity mediana", "Max DD P95", "Rischio di rovina"]
+            }},
+            es: {{ entry:"Entrada", sigTime: "SEÑAL A LAS 09:00 CET", param: "Parámetros", expT: "¿Qué ès el Umbral?", expD: "Determina la sensibilidad de la señal.", kpi:["Beneficio", "Ganas", "Operaciones", "Max DD", "PF"], sig:["FLAT","LONG","SHORT"], cols:["FECHA","TIPO","IN","OUT","PTS","PNL"], mc:["Riesgo Monte Carlo", "Equity final P5–P95", "Equity mediana", "Max DD P95", "Riesgo de ruina"] }},
+            fr: {{ entry:"Entrée", sigTime: "SIGNAL À 09:00 CET", param: "Paramètres", expT: "C'est quoi le Seuil?", expD: "Détermine la sensibilité du signal.", kpi:["Profit", "Win Rate", "Trades", "Max DD", "PF"], sig:["FLAT","LONG","SHORT"], cols:["DATE","TYPE","IN","OUT","PTS","PNL"], mc:["Risque Monte Carlo", "Equity finale P5–P95", "Equity médiane", "Max DD P95", "Risque de ruine"] }},
+            de: {{ entry:"Einstieg", sigTime: "SIGNAL UM 09:00 CET", param: "Parameter", expT: "Was ist der Schwellenwert?", expD: "Bestimmt die Signalempfindlichkeit.", kpi:["Gewinn", "Win Rate", "Trades", "Max DD", "PF"], sig:["FLAT","LONG","SHORT"], cols:["DATUM","TYP","IN","OUT","PKT","PNL"], mc:["Monte-Carlo-Risiko", "Endkapital P5–P95", "Median-Kapital", "Max DD P95", "Ruinrisiko"] }},
+            zh: {{ entry:"入场价格", sigTime: "信号时间 09:00 CET", param: "参数设置", expT: "什么是阈值？", expD: "决定信号灵敏度。", kpi:["利润", "胜率", "交易次数", "最大回撤", "PF"], sig:["平仓","做多","做空"], cols:["日期","类型","入场","出场","点数","盈亏"], mc:["蒙特卡洛风险", "最终权益 P5–P95", "权益中位数", "最大回撤 P95", "破产风险"] }},
+            ja: {{ entry:"エントリー", sigTime: "信号 09:00 CET", param: "パラメーター", expT: "しきい値とは？", expD: "信号の感度を決定します。", kpi:["利益", "勝率", "取引数", "最大ドローダウン", "PF"], sig:["フラット","ロング","ショート"], cols:["日付","タイプ","入","出","ポイント","損益"], mc:["モンテカルロ・リスク", "最終資産 P5–P95", "資産中央値", "最大ドローダウン P95", "破産リスク"] }}
+        }};
+
+        // Schema 2: colonne a precisione fissa + delta giorni -> record {{d,m,v,in,out}}
+        function decodeAsset(p) {{
+            if (p.schema !== 2) return {{ history: p.history, grid: null, ds: null, risk: null, pos: {{}}, dsPos: {{}} }};
+            const s = p.scale, c = p.cols;
+            const n = c.dd.length, h = new Array(n);
+            let t = Date.parse(p.base);
+            for (let i = 0; i < n; i++) {{
+                t += c.dd[i] * 86400000;
+                h[i] = {{ d: new Date(t).toISOString().slice(0, 10), m: c.m[i] / s.m, v: c.v[i] / s.v, in: c.in[i] / s.in, out: c.out[i] / s.out }};
+            }}
+            return {{ history: h, grid: p.grid || null, ds: p.ds || null, risk: p.risk || null, pos: {{}}, dsPos: {{}} }};
+        }}
+
+        // Griglia soglia x zoom precalcolata da backtest.py: -1 se la soglia non è in griglia
+        function gridIndex(A, thrPct) {{
+            if (!A.grid) return -1;
+            return A.grid.thr.findIndex(x => Math.abs(x - thrPct) < 1e-9);
+        }}
+
+        // Posizioni (1 / -1 / 0) della soglia k, decodificate dai salti di indice una volta sola
+        function gridPositions(A, k) {{
+            if (!A.pos[k]) {{
+                const p = new Int8Array(A.history.length);
+                let i = -1;
+                for (const g of A.grid.tr[k]) {{ i += Math.abs(g); p[i] = Math.sign(g); }}
+                A.pos[k] = p;
+            }}
+            return A.pos[k];
+        }}
+
+        // Monte Carlo dell'intero storico (risk.py) per la soglia in griglia: quantili [5,25,50,75,95]
+        function riskBox(A, k, t) {{
+            const M = A.risk;
+            if (!M || k < 0 || !M.trades[k]) return '';
+            const f = M.final[k], eur = x => Math.round(x).toLocaleString() + '€';
+            const line = (label, val, cls) => `<div class="d-flex justify-content-between small"><span>${{label}}</span><span class="fw-bold ${{cls}}">${{val}}</span></div>`;
+            return `<div class="col-12"><div class="kpi-box text-start">
+                <div class="val-big-label mb-1">${{t.mc[0]}} <span class="ts-label">${{M.sims[k].toLocaleString()}} × ${{M.trades[k]}}</span></div>
+                ${{line(t.mc[1], eur(f[0]) + ' … ' + eur(f[4]), '')}}
+                ${{line(t.mc[2], eur(f[2]), f[2] >= M.capital ? 'text-success' : 'text-danger')}}
+                ${{line(t.mc[3], M.max_dd[k][4].toFixed(1) + '%', 'text-warning')}}
+                ${{line(t.mc[4], (M.ruin[k] * 100).toFixed(1) + '%', M.ruin[k] > 0.05 ? 'text-danger' : 'text-info')}}
+            </div></div>`;
+        }}
+
+        // Posizioni LTTB dell'indice (downsample.py) per zoom e risoluzione adatta al canvas; null = tutti i punti
+        function lttbPositions(A) {{
+            if (!A.ds) return null;
+            const z = A.ds.zoom.indexOf(currentZoom);
+            if (z < 0) return null;
+            const cv = document.getElementById('chart');
+            const px = (cv.clientWidth || 1000) * (window.devicePixelRatio || 1);
+            let r = A.ds.res.findIndex(x => x >= px);
+            if (r < 0) r = A.ds.res.length - 1;
+            const gaps = A.ds.pos[r][z];
+            if (!gaps) return null;
+            const key = r + '_' + z;
+            if (!A.dsPos[key]) {{
+                const p = new Int32Array(gaps.length);
+                let i = -1;
+                gaps.forEach((g, k) => {{ i += g; p[k] = i; }});
+                A.dsPos[key] = p;
+            }}
+            return A.dsPos[key];
+        }}
+
+        // Le posizioni LTTB fanno da bucket anche per l'equity: dentro ogni bucket si aggiungono min e max
+        function thinPositions(P, eq) {{
+            const out = [];
+            for (let k = 0; k < P.length; k++) {{
+                out.push(P[k]);
+                if (k + 1 === P.length) break;
+                let lo = -1, hi = -1;
+                for (let i = P[k] + 1; i < P[k + 1]; i++) {{
+                    if (lo < 0 || eq[i] < eq[lo]) lo = i;
+                    if (hi < 0 || eq[i] > eq[hi]) hi = i;
+                }}
+                if (lo < 0) continue;
+                // Estremi già rappresentati dal segmento tra i due confini: non servono
+                const a = eq[P[k]], b = eq[P[k + 1]];
+                if (eq[lo] >= Math.min(a, b)) lo = -1;
+                if (eq[hi] <= Math.max(a, b)) hi = -1;
+                if (lo >= 0 && hi >= 0) {{ if (lo < hi) out.push(lo, hi); else out.push(hi, lo); }}
+                else if (lo >= 0) out.push(lo); else if (hi >= 0) out.push(hi);
+            }}
+            return out;
+        }}
+
+        // Export a piena risoluzione della vista corrente (il grafico è ridotto)
+        function exportCsv() {{
+            if (!fullSeries) return;
+            const s = fullSeries;
+            const lines = ['date,equity,' + s.asset];
+            s.lbl.forEach((d, i) => lines.push(d + ',' + s.eqD[i].toFixed(2) + ',' + s.idxD[i]));
+            const a = document.createElement('a');
+            a.href = URL.createObjectURL(new Blob([lines.join('\\n')], {{ type: 'text/csv' }}));
+            a.download = `${{s.asset}}_${{currentZoom || 'max'}}.csv`;
+            a.click();
+            URL.revokeObjectURL(a.href);
+        }}
+
+        // Journal virtualizzato: nel DOM solo le righe visibili (+ margine), spaziatori sopra e sotto
+        function journalRow(r) {{
+            if (r.year) return `<tr class="jr jr-year"><td class="fw-bold">${{r.year}}</td><td colspan="4">${{r.n}} ${{r.label}}</td>
+                <td class="fw-bold ${{r.pnl>=0?'text-success':'text-danger'}}">${{Math.round(r.pnl)}}€</td></tr>`;
+            return `<tr class="jr"><td>${{r.d}}</td><td class="fw-bold">${{r.t}}</td><td>${{r.in.toFixed(1)}}</td><td>${{r.out.toFixed(1)}}</td>
+                <td class="${{r.pts>=0?'text-success':'text-danger'}}">${{r.pts.toFixed(1)}}</td><td class="fw-bold">${{Math.round(r.pnl)}}€</td></tr>`;
+        }}
+
+        function renderJournal() {{
+            journalPending = false;
+            const box = document.getElementById('journal-box');
+            const first = Math.max(0, Math.floor(box.scrollTop / JOURNAL_ROW) - 10);
+            const last = Math.min(journal.length, first + Math.ceil((box.clientHeight || 450) / JOURNAL_ROW) + 20);
+            const pad = h => h > 0 ? `<tr><td colspan="6" class="p-0 border-0" style="height:${{h}}px"></td></tr>` : '';
+            document.getElementById('auditBody').innerHTML =
+                pad(first * JOURNAL_ROW) + journal.slice(first, last).map(journalRow).join('') + pad((journal.length - last) * JOURNAL_ROW);
+        }}
+
+        function scheduleJournal() {{
+            if (journalPending) return;
+            journalPending = true;
+            requestAnimationFrame(renderJournal);
+        }}
+
+        // Trade (dal più recente) raggruppati per anno, con una riga di riepilogo in testa a ogni anno.
+        // Riepiloghi: griglia (backtest.yearly_table, come la tabella del bot) se disponibile, altrimenti dai trade visibili
+        function buildJournal(rows, yearly, label) {{
+            const out = [];
+            let head = null;
+            for (let i = rows.length - 1; i >= 0; i--) {{
+                const y = rows[i].d.slice(0, 4);
+                if (!head || head.year !== y) {{
+                    head = {{ year: y, n: 0, pnl: 0, label }};
+                    if (yearly && yearly[y]) {{ head.pnl = yearly[y][0]; head.n = yearly[y][1]; head.fixed = true; }}
+                    out.push(head);
+                }}
+                if (!head.fixed) {{ head.n++; head.pnl += rows[i].pnl; }}
+                out.push(rows[i]);
+            }}
+            return out;
+        }}
+
+        // Un solo run() per frame mentre si trascina la soglia
+        function schedule() {{
+            if (pending) return;
+            pending = true;
+            requestAnimationFrame(() => {{ pending = false; run(); }});
+        }}
+
+        // Storico per asset scaricato solo quando selezionato, poi tenuto in memoria
+        function loadAsset(asset) {{
+            const meta = data.indices[asset];
+            if (!assetCache[asset]) {{
+                const url = API ? `${{API}}/api/assets/${{encodeURIComponent(asset)}}` : `{DATA_DIR}/${{meta.file}}`;
+                assetCache[asset] = fetch(`${{url}}?v=${{meta.v}}`)
+                    .then(r => {{ if (!r.ok) throw new Error(r.status); return r.json(); }})
+                    .then(decodeAsset)
+                    .catch(e => {{ delete assetCache[asset]; throw e; }});
+            }}
+            return assetCache[asset];
+        }}
+
+        function setZoom(btn, days) {{
+            currentZoom = days;
+            document.querySelectorAll('.zoom-btn').forEach(b => b.classList.remove('active'));
+            btn.classList.add('active');
+            run();
+        }}
+
+        function updateClock() {{
+            const now = new Date();
+            document.getElementById('market-clock').innerText = now.toLocaleString("it-IT", {{timeZone:"Europe/Berlin", hour:'2-digit', minute:'2-digit', second:'2-digit'}}) + " CET";
+        }}
+        setInterval(updateClock, 1000);
+
+        // FUNZIONE PER DISEGNARE CANDELABRI PROFESSIONALI (CORPO + OMBRE)
+        function drawCandle(cid, cdata) {{
+            if(cCharts[cid]) cCharts[cid].destroy();
+            cCharts[cid] = new Chart(document.getElementById(cid), {{
+                type: 'bar',
+                data: {{
+                    labels: cdata.map(x => x.d),
+                    datasets: [
+                        {{
+                            label: 'Wick',
+                            data: cdata.map(x => [x.l, x.h]),
+                            backgroundColor: '#444',
+                            barPercentage: 0.05,
+                            grouped: false
+                        }},
+                        {{
+                            label: 'Body',
+                            data: cdata.map(x => [x.o, x.c]),
+                            backgroundColor: cdata.map(x => x.c >= x.o ? '#238636' : '#da3633'),
+                            barPercentage: 0.6,
+                            grouped: false
+                        }}
+                    ]
+                }},
+                options: {{
+                    responsive: true, maintainAspectRatio: false,
+                    plugins: {{ legend: {{ display: false }}, tooltip: {{ enabled: true }} }},
+                    scales: {{ 
+                        y: {{ beginAtZero: false, grid: {{ color: '#161b22' }}, ticks: {{ color: '#8b949e', font: {{ size: 9 }} }} }},
+                        x: {{ grid: {{ display: false }}, ticks: {{ color: '#8b949e', font: {{ size: 9 }} }} }}
+                    }}
+                }}
+            }});
+        }}
+
+        async function run() {{
+            const seq = ++runSeq;
+            const asset = document.getElementById('assetS').value;
+            const lang = document.getElementById('langS').value;
+            const t = i18n[lang] || i18n['en'];
+            const thrPct = parseFloat(document.getElementById('thr').value);
+            const thr = thrPct / 100;
+            const assetData = data.indices[asset];
+            const preds = data.live_preds;
+
+            const A = await loadAsset(asset);
+            if (seq !== runSeq) return;
+            const historyFull = A.history;
+            const lastDate = historyFull[historyFull.length - 1].d;
+            document.getElementById('sig-date-label').innerText = "REF DATE: " + lastDate;
+
+            const todayStr = new Date().toISOString().split('T')[0];
+            const isLive = (lastDate === todayStr);
+
+            document.getElementById('table-head').innerHTML = t.cols.map(c => `<th>${{c}}</th>`).join('');
+            document.getElementById('t-entry').innerText = t.entry;
+            document.getElementById('t-param').innerText = t.param;
+            document.getElementById('exp-title').innerText = t.expT;
+            document.getElementById('exp-desc').innerText = t.expD;
+            document.getElementById('entry-val').innerText = "€ " + assetData.entry_price.toFixed(1);
+
+            const momLive = (preds.sp_chg + preds.nk_chg + preds.fut_chg) / 300;
+            document.getElementById('mom-val').innerText = (momLive*100).toFixed(2) + "%";
+
+            let sig = t.sig[0] + " ⚪"; let col = "#8b949e";
+            let sigElement = document.getElementById('sig-val');
+            sigElement.classList.remove('pulse-active');
+
+            const R = data.rules;
+            if (momLive > thr && preds.vix < R.vix_long) {{ 
+                sig = t.sig[1] + " 🟢"; col = "#238636"; 
+                if(isLive) sigElement.classList.add('pulse-active');
+            }}
+            else if (momLive < -thr && preds.vix < R.vix_short) {{ 
+                sig = t.sig[2] + " 🔴"; col = "#da3633"; 
+                if(isLive) sigElement.classList.add('pulse-active');
+            }}
+            sigElement.innerText = sig; sigElement.style.color = col;
+
+            // Regole da backtest.py (stesse del bot)
+            let cap = R.capital, wins = 0, total = 0, mdd = 0, maxC = R.capital, gP = 0, gL = 0;
+            let mult = R.mult[asset] || 1;
+
+            let history = historyFull;
+            if(currentZoom > 0) history = history.slice(-currentZoom);
+            const off = historyFull.length - history.length;
+
+            // In griglia: segnali e KPI già calcolati; fuori griglia: calcolo live
+            const gk = gridIndex(A, thrPct), gz = A.grid ? A.grid.zoom.indexOf(currentZoom) : -1;
+            const gPos = gk >= 0 ? gridPositions(A, gk) : null;
+            const K = (gk >= 0 && gz >= 0) ? A.grid.kpi[gk][gz] : null;
+
+            let eqD = [], lbl = [], idxD = [], rows = [];
+            history.forEach((h, i) => {{
+                let p = 0;
+                if (gPos) p = gPos[off + i];
+                else if (h.m > thr && h.v < R.vix_long) p = 1; else if (h.m < -thr && h.v < R.vix_short) p = -1;
+                if (p !== 0) {{
+                    let pts = (p === 1) ? (h.out - h.in - R.cost) : (h.in - h.out - R.cost);
+                    let pnl = pts * mult;
+                    cap += pnl;
+                    if (!K) {{ total++; if (pnl > 0) {{ wins++; gP += pnl; }} else {{ gL += Math.abs(pnl); }} }}
+                    rows.push({{ d: h.d, t: p==1?t.sig[1]:t.sig[2], in: h.in, out: h.out, pts: pts, pnl: pnl }});
+                }}
+                eqD.push(cap); lbl.push(h.d); idxD.push(h.out);
+                if (!K) {{ if (cap > maxC) maxC = cap; let dd = ((maxC - cap)/maxC)*100; if(dd > mdd) mdd = dd; }}
+            }});
+
+            // K = [profit, win_rate, trades, max_dd, pf] (backtest.KPI_FIELDS)
+            const profit = K ? K[0] : cap - R.capital;
+            const winRate = K ? K[1].toFixed(1) : (total ? ((wins/total)*100).toFixed(1) : 0);
+            const pf = K ? K[4].toFixed(2) : (gL === 0 ? gP.toFixed(2) : (gP/gL).toFixed(2));
+            document.getElementById('kpi-grid').innerHTML = `
+                <div class="col-6"><div class="kpi-box"><div class="val-big-label">${{t.kpi[0]}}</div><div class="text-success fw-bold">${{profit.toLocaleString()}}€</div></div></div>
+                <div class="col-6"><div class="kpi-box"><div class="val-big-label">${{t.kpi[1]}}</div><div class="text-info fw-bold">${{winRate}}%</div></div></div>
+                <div class="col-12"><div class="kpi-box border-warning"><div class="val-big-label" style="color:#f1c40f">${{t.kpi[4]}}</div><div class="fw-bold" style="color:#f1c40f">${{pf}}</div></div></div>
+            ` + riskBox(A, gk, t);
+
+            // Riepiloghi annuali precalcolati solo per l'intero storico (lo zoom taglia il primo anno)
+            let yearly = null;
+            if (K && currentZoom === 0 && A.grid.years) {{
+                yearly = {{}};
+                A.grid.years.forEach((y, j) => {{ yearly[y] = [A.grid.ypnl[gk][j], A.grid.ytr[gk][j]]; }});
+            }}
+            journal = buildJournal(rows, yearly, t.kpi[2]);
+            renderJournal();
+
+            // Grafico: solo i punti LTTB (+ estremi dell'equity), asse x = posizione nella finestra
+            fullSeries = {{ asset, lbl, eqD, idxD }};
+            chartLabels = lbl;
+            const P = lttbPositions(A);
+            const S = P ? thinPositions(P, eqD) : lbl.map((_, i) => i);
+            const eqPts = S.map(i => ({{ x: i, y: eqD[i] }}));
+            const idxPts = S.map(i => ({{ x: i, y: idxD[i] }}));
+
+            // Grafico aggiornato in place: niente destroy/new Chart a ogni input
+            if (myChart) {{
+                myChart.options.scales.x.max = lbl.length - 1;
+                myChart.data.datasets[0].data = eqPts;
+                myChart.data.datasets[1].data = idxPts;
+                myChart.data.datasets[1].label = asset;
+                myChart.update('none');
+                return;
+            }}
+            myChart = new Chart(document.getElementById('chart'), {{
+                data: {{ datasets: [
+                    {{ type: 'line', label: 'Equity', data: eqPts, borderColor: '#238636', borderWidth: 2.5, pointRadius: 0, yAxisID: 'y' }},
+                    {{ type: 'line', label: asset, data: idxPts, borderColor: 'rgba(241, 196, 15, 0.4)', borderWidth: 1.5, pointRadius: 0, yAxisID: 'y1' }}
+                ]}},
+                options: {{
+                    responsive: true, maintainAspectRatio: false, animation: false, parsing: false, normalized: true,
+                    scales: {{
+                        x: {{ type: 'linear', min: 0, max: lbl.length - 1,
+                              ticks: {{ color: '#8b949e', maxTicksLimit: 10, callback: v => chartLabels[Math.round(v)] || '' }}, grid: {{ color: '#161b22' }} }},
+                        y: {{ position: 'left', ticks: {{ color: '#238636' }}, grid: {{ color: '#30363d' }} }},
+                        y1: {{ position: 'right', ticks: {{ color: '#f1c40f' }}, grid: {{ display: false }} }}
+                    }},
+                    plugins: {{ legend: {{ display: false }},
+                               tooltip: {{ callbacks: {{ title: items => items.length ? chartLabels[items[0].parsed.x] : '' }} }} }}
+                }}
+            }});
+        }}
+        window.onload = () => {{
+            updateClock();
+            // Render Candele Real OHLC (non dipendono da asset e soglia)
+            drawCandle('cSP', data.candles.sp);
+            drawCandle('cNK', data.candles.nk);
+            drawCandle('cFUT', data.candles.fut);
+            document.getElementById('journal-box').addEventListener('scroll', scheduleJournal);
+            if (!API) return run();
+            return fetch(`${{API}}/api/manifest`)
+                .then(r => {{ if (!r.ok) throw new Error(r.status); return r.json(); }})
+                .then(m => {{ Object.assign(data, m); }})
+                .catch(e => console.warn('API non raggiungibile, dati statici', e))
+                .then(run);
+        }};
+    </script>
+</body>
+</html>
+"""
@@ -0,0 +1,135 @@
+# =============================================================================
+# QUANT-PRO - RISCHIO MONTE CARLO (BLOCK BOOTSTRAP DEL PNL DEI TRADE)
+# =============================================================================
+# Dal PnL dei trade storici di una soglia si ricampionano N percorsi della stessa lunghezza,
+# a blocchi di trade consecutivi (circular block bootstrap: block=1 -> bootstrap semplice).
+# Per ogni percorso, da CAPITALE: equity finale, max drawdown %, rovina (equity <= RUIN_EQUITY).
+# Un percorso rovinato smette di operare: dal primo attraversamento l'equity resta a RUIN_EQUITY,
+# quindi max DD <= 100% ed equity finale e probabilità di rovina descrivono lo stesso processo.
+# Tutto a matrici NumPy (percorsi x trade), a lotti di BATCH percorsi per contenere la memoria.
+#
+# QUANT_MC_SIMS (default 10000) e QUANT_MC_BLOCK (default 5) regolano numero di percorsi e blocco;
+# seed fisso: stesso input -> stessi numeri (nessun diff inutile nei file generati).
+# Nella griglia i percorsi pieni servono solo alle soglie mostrate di default (FOCUS_THR: pagina e bot),
+# le altre usano QUANT_MC_SIMS_GRID percorsi (default 1000). Con una cache (analytics_state.load_risk)
+# indicizzata dai KPI MAX dello stato incrementale si risimulano solo le soglie i cui trade sono cambiati.
+
+import os
+import json
+import hashlib
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from backtest import CAPITALE, GRID_THR, SOGLIA_DASHBOARD, SOGLIA_BOT, run_backtest
+
+MC_SIMS = int(os.getenv('QUANT_MC_SIMS', '10000'))
+MC_SIMS_GRID = int(os.getenv('QUANT_MC_SIMS_GRID', '1000'))
+MC_BLOCK = int(os.getenv('QUANT_MC_BLOCK', '5'))
+MC_SEED = 8
+FOCUS_THR = [SOGLIA_DASHBOARD, SOGLIA_BOT]
+QUANTILES = [5, 25, 50, 75, 95]
+RUIN_EQUITY = 0
+# Versione dei riepiloghi in cache (cambia se cambia il modello di simulazione)
+RISK_SCHEMA = 2
+BATCH = 2000
+
+
+def bootstrap(pnl, sims=MC_SIMS, block=MC_BLOCK, capital=CAPITALE, seed=MC_SEED, ruin=RUIN_EQUITY):
+    # pnl (n,) dei soli trade, in ordine: restituisce equity finale, max drawdown % e rovina per percorso
+    pnl = np.asarray(pnl, dtype='float64')
+    n = len(pnl)
+    final = np.full(sims, float(capital))
+    max_dd = np.zeros(sims)
+    ruined = np.zeros(sims, dtype=bool)
+    if not n: return {'final': final, 'max_dd': max_dd, 'ruin': ruined}
+    rng = np.random.default_rng(seed)
+    block = max(1, min(block, n))
+    nb = -(-n // block)
+    # Blocchi circolari: riga s = pnl[s : s + block] (con ritorno all'inizio), vista senza copie
+    blocks = sliding_window_view(np.concatenate([pnl, pnl[:block - 1]]), block)
+    for lo in range(0, sims, BATCH):
+        hi = min(sims, lo + BATCH)
+        equity = blocks[rng.integers(0, n, (hi - lo, nb))].reshape(hi - lo, -1)[:, :n]
+        np.cumsum(equity, axis=1, out=equity)
+        equity += capital
+        final[lo:hi] = equity[:, -1]
+        below = equity <= ruin
+        first = below.argmax(axis=1)
+        bad = np.flatnonzero(below[np.arange(hi - lo), first])
+        ruined[lo + bad] = True
+        peak = np.maximum.accumulate(equity, axis=1)
+        np.maximum(peak, capital, out=peak)
+        # Percorsi rovinati (assorbiti): equity finale = ruin, max DD = 1 - ruin / picco al primo attraversamento
+        # (prima l'equity è sopra ruin, dopo resta ferma: nessun drawdown maggiore)
+        ruin_peak = peak[bad, first[bad]]
+        # drawdown = 1 - equity / picco, calcolato sul buffer del picco
+        np.divide(equity, peak, out=peak)
+        max_dd[lo:hi] = (1 - peak.min(axis=1)) * 100
+        final[lo + bad] = ruin
+        max_dd[lo + bad] = (1 - ruin / ruin_peak) * 100
+    return {'final': final, 'max_dd': max_dd, 'ruin': ruined}
+
+
+def risk_summary(pnl, sims=MC_SIMS, block=MC_BLOCK, capital=CAPITALE, seed=MC_SEED):
+    sim = bootstrap(pnl, sims, block, capital, seed)
+    return {
+        'trades': int(len(pnl)),
+        'final': np.percentile(sim['final'], QUANTILES).tolist(),
+        'max_dd': np.percentile(sim['max_dd'], QUANTILES).tolist(),
+        'ruin': float(sim['ruin'].mean()),
+    }
+
+
+def risk_params():
+    # Tutto ciò che cambia i numeri della griglia oltre ai trade (entra nel fingerprint del motore)
+    return {'sims': MC_SIMS, 'sims_grid': MC_SIMS_GRID, 'block': MC_BLOCK, 'seed': MC_SEED, 'focus': FOCUS_THR,
+            'q': QUANTILES, 'ruin': RUIN_EQUITY}
+
+
+def _key(data, sims, block, capital):
+    # data: byte dei PnL dei trade, o dei KPI MAX della soglia già accumulati (analytics_state)
+    h = hashlib.sha1(data)
+    h.update(json.dumps([RISK_SCHEMA, sims, block, capital, MC_SEED, QUANTILES, RUIN_EQUITY]).encode('utf-8'))
+    return h.hexdigest()[:20]
+
+
+def _summary(pnl, sims, block):
+    r = risk_summary(pnl, sims, block, CAPITALE)
+    return {'trades': r['trades'], 'final': np.round(r['final'], 2).tolist(),
+            'max_dd': np.round(r['max_dd'], 2).tolist(), 'ruin': round(r['ruin'], 4)}
+
+
+def risk_grid(rows, mult, thr_grid=GRID_THR, sims=MC_SIMS, block=MC_BLOCK, res=None, sims_grid=MC_SIMS_GRID,
+              focus=FOCUS_THR, cache=None, full=None):
+    # Una riga per soglia della griglia (storico completo): quantili equity finale / max DD, probabilità di rovina.
+    # res: run_backtest già calcolato sulla griglia (evita di rifarlo)
+    # cache: {chiave: riepilogo} del run precedente, aggiornata sul posto (solo le chiavi attuali)
+    # full: analytics_state.grid_summary -> chiavi dai KPI MAX per soglia (trade, PnL cumulato, DD, ...):
+    #       le soglie invariate non costano nulla, il backtest gira solo sulle soglie da risimulare
+    thr = np.asarray(thr_grid, dtype='float64') / 100
+    n_sims = [sims if round(pct, 2) in focus else min(sims, sims_grid) for pct in thr_grid]
+    cached = cache or {}
+    if full is not None:
+        keys = [_key(b'kpi' + np.asarray(full['kpi'][t], dtype='float64').tobytes(), n_sims[t], block, CAPITALE)
+                for t in range(len(thr))]
+        todo = [t for t in range(len(thr)) if keys[t] not in cached]
+        pnl = {}
+        if todo:
+            sub = run_backtest(rows, thr[todo], mult)
+            pnl = {t: sub['pnl'][i][sub['traded'][i]] for i, t in enumerate(todo)}
+    else:
+        res = res if res is not None else run_backtest(rows, thr, mult)
+        pnl = {t: res['pnl'][t][res['traded'][t]] for t in range(len(thr))}
+        keys = [_key(b'pnl' + np.ascontiguousarray(pnl[t]).tobytes(), n_sims[t], block, CAPITALE) for t in range(len(thr))]
+
+    out = {'thr': list(thr_grid), 'sims': n_sims, 'block': block, 'capital': CAPITALE, 'q': QUANTILES,
+           'trades': [], 'final': [], 'max_dd': [], 'ruin': []}
+    fresh = {}
+    for t in range(len(thr)):
+        r = cached.get(keys[t])
+        if r is None: r = _summary(pnl[t], n_sims[t], block)
+        fresh[keys[t]] = r
+        for f in ('trades', 'final', 'max_dd', 'ruin'): out[f].append(r[f])
+    if cache is not None:
+        cache.clear()
+        cache.update(fresh)
+    return out
@@ -0,0 +1,273 @@
+# =============================================================================
+# QUANT-PRO - SERVIZIO LOCALE: DATI E BACKTEST CALDI IN MEMORIA + API JSON
+# Uso: python server.py [--port 8765] [--every 15] [--offline] [--write]
+# =============================================================================
+# Il processo resta acceso: moduli importati, blob degli asset e griglie KPI restano in memoria.
+# Ogni --every minuti aggiorna la cache (download incrementale) e ricostruisce solo se il
+# fingerprint degli input è cambiato; le richieste continuano a usare la versione precedente
+# finché la nuova non è pronta (sostituzione atomica dello snapshot).
+#
+#   GET /                        dashboard (come index.html, asset da /data/ del servizio)
+#   GET /data/<file>             manifest.json e <ASSET>.json, come i file statici
+#   GET /api/manifest            predittori live, indice asset, regole
+#   GET /api/assets/<ASSET>      storico colonnare + griglia KPI + posizioni LTTB
+#   GET /api/grid/<ASSET>        solo griglia KPI
+#   GET /api/signal[?thr=0.30]   segnale live per asset alla soglia (in %), stesse regole della pagina
+#   GET /api/status              fingerprint, ultimo aggiornamento, tempi per stadio
+#
+# ETag = sha1 del corpo: con If-None-Match uguale -> 304 senza corpo.
+# gzip se il client lo accetta: compresso una volta per versione, poi riusato.
+# L'index.html statico può leggere dal servizio con ?api=http://127.0.0.1:8765
+
+import os
+import json
+import math
+import gzip
+import time
+import hashlib
+import argparse
+import threading
+import traceback
+from datetime import datetime, timezone
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs, unquote
+import numpy as np
+import quant_pro_engine as engine
+from backtest import SOGLIA_DASHBOARD, signals
+from metrics import StageTimer
+
+PORT = int(os.getenv('QUANT_PORT', '8765'))
+EVERY_MIN = float(os.getenv('QUANT_REFRESH_MIN', '15'))
+DEFAULT_THR = SOGLIA_DASHBOARD
+GZIP_MIN = 1024
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat(timespec='seconds')
+
+
+def _dumps(obj):
+    return json.dumps(obj, separators=(',', ':'))
+
+
+class Resource:
+    # Corpo già serializzato con ETag; la versione gzip si calcola alla prima richiesta
+    __slots__ = ('body', 'ctype', 'etag', '_gz')
+
+    def __init__(self, body, ctype='application/json'):
+        self.body = body.encode('utf-8') if isinstance(body, str) else body
+        self.ctype = ctype
+        self.etag = '"' + hashlib.sha1(self.body).hexdigest()[:20] + '"'
+        self._gz = None
+
+    def gzipped(self):
+        if self._gz is None: self._gz = gzip.compress(self.body, 6, mtime=0)
+        return self._gz
+
+
+class Snapshot:
+    # Una versione completa dei dati: sostituita in blocco a ogni ricostruzione
+    def __init__(self, out, timer):
+        manifest = out['manifest']
+        self.build = out['build']
+        self.built = _now()
+        self.stages = timer.summary()
+        self.manifest = manifest
+        self.last_day = {name: int(info['rows']['d'][-1]) for name, info in out['market_data']['indices'].items()
+                         if len(info['rows'])}
+        self.blobs = out['asset_blobs']
+        self.grids = {}
+        self.res = {'/api/manifest': Resource(_dumps(manifest))}
+        self.res['/data/manifest.json'] = self.res['/api/manifest']
+        self.res['/'] = self.res['/index.html'] = Resource(out['html'], 'text/html; charset=utf-8')
+        for name, raw in self.blobs.items():
+            self.res[f'/api/assets/{name}'] = self.res[f"/data/{manifest['indices'][name]['file']}"] = Resource(raw)
+
+    def grid(self, name):
+        # Griglia separata solo se richiesta: niente parsing dei blob a ogni ricostruzione
+        if name not in self.grids and name in self.blobs:
+            self.grids[name] = Resource(_dumps(json.loads(self.blobs[name])['grid']))
+        return self.grids.get(name)
+
+    def signal(self, thr_pct):
+        # Come run() nella pagina: momentum live = media delle variazioni S&P, Nikkei, future 00-08
+        p, R = self.manifest['live_preds'], self.manifest['rules']
+        mom = (p['sp_chg'] + p['nk_chg'] + p['fut_chg']) / 300
+        s = int(signals(np.float64(mom), np.float64(p['vix']), thr_pct / 100, R['vix_long'], R['vix_short']))
+        label = {1: 'LONG', -1: 'SHORT', 0: 'FLAT'}[s]
+        assets = {}
+        for name, info in self.manifest['indices'].items():
+            day = self.last_day.get(name)
+            assets[name] = {'signal': label, 'pos': s, 'entry_price': info['entry_price'], 'last_price': info['last_price'],
+                            'date': str(np.datetime64(day, 'D')) if day is not None else None}
+        return Resource(_dumps({'thr': thr_pct, 'momentum': round(mom * 100, 4), 'vix': p['vix'],
+                                'built': self.built, 'assets': assets}))
+
+
+class Service:
+    def __init__(self, offline=False, every_min=EVERY_MIN, write=False):
+        self.offline = offline
+        self.every = every_min * 60
+        self.write = write
+        self.snapshot = None
+        self.refreshes = 0
+        self.last_check = None
+        self.last_error = None
+        self.stop = threading.Event()
+        self.lock = threading.Lock()
+
+    def refresh(self, force=False):
+        # Un solo aggiornamento alla volta; None se gli input non sono cambiati
+        with self.lock:
+            timer = StageTimer()
+            prev = None if force or self.snapshot is None else self.snapshot.build['fingerprint']
+            self.last_check = _now()
+            out = engine.generate(self.offline, timer, skip_fingerprint=prev)
+            if out is None:
+                print(f"⏭️ {self.last_check} dati invariati (fingerprint {prev[:12]})")
+                return None
+            if self.write:
+                with timer.stage('write_outputs'):
+                    changed = engine.write_outputs(out['market_data'], out['manifest'], out['asset_blobs'], out['html'],
+                                                   build=out['build'])
+                print(f"💾 File aggiornati: {len(changed)}")
+            self.snapshot = Snapshot(out, timer)
+            self.refreshes += 1
+            del out
+            print(f"♻️ {self.snapshot.built} snapshot {self.snapshot.build['fingerprint'][:12]} "
+                  f"({len(self.snapshot.blobs)} asset, {timer.summary()['total_s']:.1f}s)")
+            return self.snapshot
+
+    def loop(self):
+        while not self.stop.wait(self.every):
+            try:
+                self.refresh()
+                self.last_error = None
+            except Exception as e:
+                # Si continua a servire lo snapshot precedente
+                self.last_error = f"{self.last_check}: {e!r}"
+                print(f"⚠️ Aggiornamento fallito, resta lo snapshot precedente ({e!r})")
+                traceback.print_exc()
+
+    def status(self):
+        snap = self.snapshot
+        return Resource(_dumps({
+            'fingerprint': snap.build['fingerprint'], 'inputs': snap.build['inputs'], 'built': snap.built,
+            'last_check': self.last_check, 'last_error': self.last_error, 'refreshes': self.refreshes,
+            'every_s': self.every, 'offline': self.offline, 'metrics': snap.stages,
+        }))
+
+
+def _accepts_gzip(header):
+    for part in (header or '').split(','):
+        token, _, q = part.strip().partition(';')
+        if token.strip().lower() in ('gzip', '*'):
+            q = q.strip()
+            return not (q.startswith('q=') and q[2:].strip('0.') == '')
+    return False
+
+
+def _etag_match(header, etag):
+    if not header: return False
+    base = etag.strip('"')
+    for tag in header.split(','):
+        tag = tag.strip()
+        if tag == '*': return True
+        if tag.startswith('W/'): tag = tag[2:]
+        if tag.strip('"') in (base, base + '-gz'): return True
+    return False
+
+
+class Handler(BaseHTTPRequestHandler):
+    server_version = 'QuantPro'
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self._serve(body=True)
+
+    def do_HEAD(self):
+        self._serve(body=False)
+
+    def _resource(self):
+        service = self.server.service
+        snap = service.snapshot
+        url = urlsplit(self.path)
+        path = unquote(url.path)
+        if path in snap.res: return snap.res[path]
+        if path.startswith('/api/grid/'): return snap.grid(path[len('/api/grid/'):])
+        if path == '/api/signal':
+            try:
+                thr = float(parse_qs(url.query).get('thr', [DEFAULT_THR])[0])
+            except ValueError:
+                return 400
+            # nan/inf passano da float() ma non sono JSON valido
+            if not math.isfinite(thr): return 400
+            return snap.signal(thr)
+        if path == '/api/status': return service.status()
+        return None
+
+    def _serve(self, body):
+        res = self._resource()
+        if not isinstance(res, Resource):
+            code = res or 404
+            msg = _dumps({'error': {400: 'parametro non valido', 404: 'risorsa non trovata'}[code]}).encode('utf-8')
+            self.send_response(code)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(msg)))
+            self.end_headers()
+            if body: self.wfile.write(msg)
+            return
+
+        zipped = len(res.body) >= GZIP_MIN and _accepts_gzip(self.headers.get('Accept-Encoding'))
+        etag = res.etag[:-1] + '-gz"' if zipped else res.etag
+        if _etag_match(self.headers.get('If-None-Match'), res.etag):
+            self.send_response(304)
+            self._common(etag)
+            self.end_headers()
+            return
+        payload = res.gzipped() if zipped else res.body
+        self.send_response(200)
+        self._common(etag)
+        self.send_header('Content-Type', res.ctype)
+        self.send_header('Content-Length', str(len(payload)))
+        if zipped: self.send_header('Content-Encoding', 'gzip')
+        self.end_headers()
+        if body: self.wfile.write(payload)
+
+    def _common(self, etag):
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Vary', 'Accept-Encoding')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Access-Control-Expose-Headers', 'ETag')
+
+
+def serve(host='127.0.0.1', port=PORT, offline=False, every_min=EVERY_MIN, write=False):
+    service = Service(offline, every_min, write)
+    t0 = time.perf_counter()
+    service.refresh(force=True)
+    print(f"⏱️ primo snapshot in {time.perf_counter() - t0:.1f}s")
+    threading.Thread(target=service.loop, name='refresh', daemon=True).start()
+
+    httpd = ThreadingHTTPServer((host, port), Handler)
+    httpd.daemon_threads = True
+    httpd.service = service
+    print(f"🌐 Quant-Pro su http://{host}:{httpd.server_address[1]}/ (aggiornamento ogni {every_min:g} min)")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.stop.set()
+        httpd.server_close()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Servizio Quant-Pro: dati caldi in memoria e API JSON locale")
+    ap.add_argument('--host', default='127.0.0.1')
+    ap.add_argument('--port', type=int, default=PORT)
+    ap.add_argument('--every', type=float, default=EVERY_MIN, help="minuti tra un aggiornamento e l'altro")
+    ap.add_argument('--offline', action='store_true', help="solo cache locale, nessun download")
+    ap.add_argument('--write', action='store_true', help="scrive anche index.html e data/ a ogni ricostruzione")
+    args = ap.parse_args()
+    serve(args.host, args.port, args.offline or engine.OFFLINE, args.every, args.write)
@@ -0,0 +1,206 @@
+# =============================================================================
+# QUANT-PRO - LOG DEI SEGNALI LIVE (APPEND-ONLY, COLONNARE, MAPPABILE IN MEMORIA)
+# Uso: python snapshots.py [--asset DAX] [--from 2026-01-01] [--to 2026-12-31] [--thr 0.30]
+# =============================================================================
+# Ogni run che rigenera la dashboard aggiunge una riga per asset con quello che il sistema
+# mostrava in quel momento: predittori live, momentum, VIX, prezzi e segnale per ogni soglia
+# della griglia (bit t di long/short = backtest.GRID_THR[t]).
+#
+# DATA_DIR/snapshots/<colonna>.bin   valori little-endian a larghezza fissa, solo in append
+# DATA_DIR/snapshots/schema.json     colonne, codici asset (solo in aggiunta), griglia soglie
+#
+# Le righe sono in ordine di run, quindi 'ts' (secondi UTC del run) è non decrescente; 'day' (giorni dal
+# 1970 dell'ultima seduta dell'asset) no: un mercato chiuso o in ritardo registra una seduta precedente.
+# Un intervallo di date parte da una ricerca binaria su 'ts' (una seduta non può essere registrata prima
+# del suo giorno, meno DAY_MARGIN per i fusi) e filtra 'day' solo da lì in poi.
+# Colonne di lunghezza diversa (run interrotto a metà) si riallineano alla più corta.
+# Schema o griglia cambiati: il log precedente viene archiviato in snapshots-<data>/.
+
+import os
+import json
+import argparse
+import numpy as np
+from datetime import datetime, timezone
+from payload_codec import DATA_DIR, load_artifact, write_if_changed
+from backtest import GRID_THR, SOGLIA_DASHBOARD, VIX_LONG, VIX_SHORT, load_rows, run_backtest, signals
+
+LOG_SCHEMA = 1
+LOG_DIR = 'snapshots'
+DAY_MARGIN = 2
+COLUMNS = [
+    ('ts', '<i8'), ('day', '<i4'), ('asset', '<u2'),
+    ('sp_chg', '<f8'), ('nk_chg', '<f8'), ('fut_chg', '<f8'), ('vix', '<f8'), ('mom', '<f8'),
+    ('entry_price', '<f8'), ('last_price', '<f8'), ('long', '<u4'), ('short', '<u4'),
+]
+SNAP_DTYPE = np.dtype(COLUMNS)
+
+
+def log_dir(data_dir=DATA_DIR):
+    return os.path.join(data_dir, LOG_DIR)
+
+
+def _schema_path(path):
+    return os.path.join(path, 'schema.json')
+
+
+def load_schema(path):
+    try:
+        with open(_schema_path(path), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _new_schema():
+    return {'schema': LOG_SCHEMA, 'columns': [list(c) for c in COLUMNS], 'assets': [], 'thr': list(GRID_THR)}
+
+
+def _compatible(schema):
+    return (schema is not None and schema.get('schema') == LOG_SCHEMA and
+            schema.get('columns') == [list(c) for c in COLUMNS] and schema.get('thr') == list(GRID_THR))
+
+
+def _length(path):
+    # Righe complete: la colonna più corta
+    sizes = [os.path.getsize(f) // np.dtype(dt).itemsize if os.path.exists(f) else 0
+             for f, dt in ((os.path.join(path, f"{name}.bin"), dt) for name, dt in COLUMNS)]
+    return min(sizes)
+
+
+def snapshot_rows(manifest, market_data, ts=None):
+    # Una riga per asset dal manifest appena generato (segnale come run() nella pagina)
+    preds = manifest['live_preds']
+    rules = manifest.get('rules', {})
+    mom = (preds['sp_chg'] + preds['nk_chg'] + preds['fut_chg']) / 300
+    pos = signals(np.float64(mom), np.float64(preds['vix']), np.asarray(GRID_THR) / 100,
+                  rules.get('vix_long', VIX_LONG), rules.get('vix_short', VIX_SHORT))
+    bits = 1 << np.arange(len(GRID_THR), dtype=np.uint64)
+    long_mask, short_mask = int(bits[pos == 1].sum()), int(bits[pos == -1].sum())
+    ts = int(ts if ts is not None else datetime.now(timezone.utc).timestamp())
+    out = []
+    for name, meta in manifest['indices'].items():
+        rows = market_data['indices'][name]['rows']
+        if not len(rows): continue
+        out.append({'ts': ts, 'day': int(rows['d'][-1]), 'asset': name,
+                    'sp_chg': preds['sp_chg'], 'nk_chg': preds['nk_chg'], 'fut_chg': preds['fut_chg'], 'vix': preds['vix'],
+                    'mom': mom, 'entry_price': meta['entry_price'], 'last_price': meta['last_price'],
+                    'long': long_mask, 'short': short_mask})
+    return out
+
+
+def append(records, data_dir=DATA_DIR):
+    # Aggiunge le righe in coda a ogni colonna; restituisce il numero di righe totali
+    if not records: return None
+    path = log_dir(data_dir)
+    schema = load_schema(path)
+    if schema is not None and not _compatible(schema):
+        archived = f"{path}-{datetime.now(timezone.utc):%Y%m%d%H%M%S}"
+        os.replace(path, archived)
+        print(f"♻️ Log snapshot con schema/griglia diversi archiviato in {archived}")
+        schema = None
+    os.makedirs(path, exist_ok=True)
+    schema = schema or _new_schema()
+    for r in records:
+        if r['asset'] not in schema['assets']: schema['assets'].append(r['asset'])
+    write_if_changed(_schema_path(path), json.dumps(schema, indent=1))
+
+    n = _length(path)
+    arr = np.zeros(len(records), dtype=SNAP_DTYPE)
+    for name, _ in COLUMNS:
+        arr[name] = [schema['assets'].index(r['asset']) if name == 'asset' else r[name] for r in records]
+    for name, dt in COLUMNS:
+        with open(os.path.join(path, f"{name}.bin"), 'ab') as f:
+            # Coda parziale di un run interrotto: si riparte dall'ultima riga completa
+            f.truncate(n * np.dtype(dt).itemsize)
+            f.write(np.ascontiguousarray(arr[name]).tobytes())
+    return n + len(records)
+
+
+def open_log(data_dir=DATA_DIR):
+    # Colonne mappate in memoria (nessuna lettura finché non si indicizzano) + schema
+    path = log_dir(data_dir)
+    schema = load_schema(path)
+    if schema is None: return None, {}
+    n = _length(path)
+    cols = {}
+    for name, dt in COLUMNS:
+        cols[name] = np.memmap(os.path.join(path, f"{name}.bin"), dtype=dt, mode='r', shape=(n,)) if n else np.empty(0, dtype=dt)
+    return schema, cols
+
+
+def _day(value):
+    return int(np.datetime64(value, 'D').astype(np.int64))
+
+
+def query(start=None, end=None, assets=None, data_dir=DATA_DIR):
+    # Righe con start <= seduta <= end (date ISO) e asset tra quelli dati, come array strutturato
+    schema, cols = open_log(data_dir)
+    if schema is None: return np.empty(0, dtype=SNAP_DTYPE), schema
+    lo = int(np.searchsorted(cols['ts'], (_day(start) - DAY_MARGIN) * 86400, side='left')) if start else 0
+    day = cols['day'][lo:]
+    mask = np.ones(len(day), dtype=bool)
+    if start: mask &= day >= _day(start)
+    if end: mask &= day <= _day(end)
+    if assets:
+        codes = [schema['assets'].index(a) for a in assets if a in schema['assets']]
+        mask &= np.isin(cols['asset'][lo:], codes)
+    sel = lo + np.flatnonzero(mask)
+    out = np.empty(len(sel), dtype=SNAP_DTYPE)
+    for name, _ in COLUMNS:
+        out[name] = cols[name][sel]
+    return out, schema
+
+
+def live_positions(snaps, k):
+    # Segnale registrato alla soglia GRID_THR[k]: 1 / -1 / 0
+    bit = np.uint32(1 << k)
+    return (snaps['long'] & bit != 0).astype(np.int8) - (snaps['short'] & bit != 0).astype(np.int8)
+
+
+def audit(asset, start=None, end=None, thr=SOGLIA_DASHBOARD, data_dir=DATA_DIR):
+    # Segnale registrato vs segnale del backtest sulle righe attuali (artifact), per seduta.
+    # Più snapshot della stessa seduta: vale l'ultimo.
+    k = GRID_THR.index(round(thr, 2))
+    snaps, schema = query(start, end, [asset], data_dir)
+    if not len(snaps): return []
+    # Per seduta, in ordine di run (la seduta registrata può tornare indietro dopo una revisione)
+    snaps = snaps[np.argsort(snaps['day'], kind='stable')]
+    last = np.flatnonzero(np.append(snaps['day'][1:] != snaps['day'][:-1], True))
+    snaps = snaps[last]
+    rows = load_rows(load_artifact(data_dir), asset, data_dir=data_dir)
+    pos = run_backtest(rows, thr / 100, 1)['pos']
+    at = np.searchsorted(rows['d'], snaps['day'])
+    found = (at < len(rows)) & (rows['d'][np.minimum(at, len(rows) - 1)] == snaps['day'])
+    live = live_positions(snaps, k)
+    out = []
+    for i, s in enumerate(snaps):
+        j = at[i]
+        out.append({
+            'day': str(np.datetime64(int(s['day']), 'D')),
+            'ts': datetime.fromtimestamp(int(s['ts']), timezone.utc).isoformat(timespec='seconds'),
+            'live': int(live[i]), 'live_mom': float(s['mom']), 'live_vix': float(s['vix']),
+            'backtest': int(pos[j]) if found[i] else None,
+            'bt_mom': float(rows['m'][j]) if found[i] else None, 'bt_vix': float(rows['v'][j]) if found[i] else None,
+        })
+    return out
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Audit segnali live registrati vs backtest")
+    ap.add_argument('--asset')
+    ap.add_argument('--from', dest='start')
+    ap.add_argument('--to', dest='end')
+    ap.add_argument('--thr', type=float, default=SOGLIA_DASHBOARD, help="soglia in %% (deve essere in griglia)")
+    args = ap.parse_args()
+
+    schema = load_schema(log_dir())
+    if schema is None:
+        print(f"⚠️ Nessun log in {log_dir()}")
+    for asset in ([args.asset] if args.asset else (schema or {}).get('assets', [])):
+        rows = audit(asset, args.start, args.end, args.thr)
+        diff = [r for r in rows if r['backtest'] is not None and r['live'] != r['backtest']]
+        print(f"*{asset}* {len(rows)} sedute registrate, {len(diff)} con segnale diverso dal backtest (soglia {args.thr:.2f}%)")
+        for r in rows:
+            mark = '' if r['backtest'] is None or r['live'] == r['backtest'] else '  ⚠️'
+            bt = '-' if r['backtest'] is None else f"{r['backtest']:+d} (m {r['bt_mom'] * 100:+.3f}%, vix {r['bt_vix']:.1f})"
+            print(f"  {r['day']}  live {r['live']:+d} (m {r['live_mom'] * 100:+.3f}%, vix {r['live_vix']:.1f})  backtest {bt}{mark}")
@@ -0,0 +1,72 @@
+import os
+import sys
+import json
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import analytics_state
+from analytics_state import SETTLE_DAYS, advance, grid_summary
+from backtest import ROW_DTYPE, kpi_grid
+
+MULT = 5
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(analytics_state, 'CACHE_DIR', str(tmp_path))
+    monkeypatch.delenv('QUANT_REBUILD', raising=False)
+
+
+def _rows(n=700, seed=3):
+    # Righe come le decodifica la pagina (precisione fissa), giorni feriali con qualche buco
+    rng = np.random.default_rng(seed)
+    days = np.arange(np.datetime64('2023-01-02'), np.datetime64('2023-01-02') + int(n * 1.5))
+    days = days[np.is_busday(days)][:n]
+    days = np.delete(days, rng.choice(n, n // 30, replace=False))
+    rows = np.empty(len(days), dtype=ROW_DTYPE)
+    rows['d'] = days.astype(np.int64)
+    rows['m'] = np.round(rng.normal(0, 0.006, len(rows)), 6)
+    rows['v'] = np.round(rng.uniform(10, 40, len(rows)), 2)
+    close = 1000 * np.exp(np.cumsum(rng.normal(0, 0.01, len(rows))))
+    rows['in'] = np.round(close * (1 + rng.normal(0, 0.003, len(rows))), 2)
+    rows['out'] = np.round(close, 2)
+    return rows
+
+
+def _same(rows, state):
+    return json.dumps(kpi_grid(rows, MULT, full=grid_summary(state))) == json.dumps(kpi_grid(rows, MULT))
+
+
+def _settled(rows):
+    return int(np.searchsorted(rows['d'], rows['d'][-1] - SETTLE_DAYS, side='right'))
+
+
+def test_daily_folds_match_full_recompute():
+    rows = _rows()
+    state, mode = advance('T', rows[:400], MULT)
+    assert mode == 'rebuild' and _same(rows[:400], state)
+    for n in list(range(401, 430)) + [480, 560, len(rows)]:
+        state, mode = advance('T', rows[:n], MULT)
+        assert mode == 'incremental'
+        assert _same(rows[:n], state)
+
+
+def test_revision_before_settled_row_rebuilds():
+    rows = _rows()
+    advance('T', rows[:500], MULT)
+    last_settled = int(rows['d'][_settled(rows[:500]) - 1])
+    state, mode = advance('T', rows[:501], MULT, revised_day=last_settled)
+    assert mode == 'rebuild' and _same(rows[:501], state)
+    # Revisione solo nelle righe non assestate: lo stato resta valido
+    state, mode = advance('T', rows[:502], MULT, revised_day=int(rows['d'][501]))
+    assert mode == 'incremental' and _same(rows[:502], state)
+
+
+def test_changed_tail_rebuilds():
+    rows = _rows()
+    advance('T', rows[:500], MULT)
+    changed = rows[:501].copy()
+    changed['out'][_settled(rows[:500]) - 2] += 7.5
+    state, mode = advance('T', changed, MULT)
+    assert mode == 'rebuild' and _same(changed, state)
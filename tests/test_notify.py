@@ -0,0 +1,22 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from notify import MARKERS, message_len, split_message
+
+
+def _balanced(chunk):
+    return all(chunk.count(m) % 2 == 0 for m in MARKERS)
+
+
+def test_marker_opened_at_start_is_closed_in_every_chunk():
+    for text in ("*" + "x" * 5000 + "* fine", "*_" + "y" * 9000 + "_* z"):
+        chunks = split_message(text, 4096, ())
+        assert len(chunks) > 1
+        assert all(message_len(c) <= 4096 and _balanced(c) for c in chunks)
+
+
+def test_split_at_separators_reassembles():
+    text = "\n".join(("riga *%d* " % i) * 20 for i in range(400))
+    chunks = split_message(text)
+    assert "".join(chunks) == text and all(message_len(c) <= 4096 for c in chunks)
@@ -0,0 +1,96 @@
+import os
+import sys
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from notify import TelegramClient, split_message
+
+OK = (200, {'ok': True, 'result': {'message_id': 1}})
+
+
+class _Stub(BaseHTTPRequestHandler):
+    # Finto Bot API: registra ogni richiesta e risponde col copione della chat (poi 200)
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        with self.server.lock:
+            self.server.log.append((self.path, body))
+            script = self.server.script.get(body['chat_id'], [])
+            status, reply = script.pop(0) if script else OK
+            if status == 200: self.server.delivered.append(body)
+        data = json.dumps(reply).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _Stub)
+    server.lock, server.log, server.delivered, server.script = threading.Lock(), [], [], {}
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _client(stub, sleeps, **kw):
+    return TelegramClient('TOKEN', api=f"http://127.0.0.1:{stub.server_port}/", sleep=sleeps.append, **kw)
+
+
+def test_retry_after_is_honoured(stub):
+    stub.script[1] = [(429, {'ok': False, 'error_code': 429, 'parameters': {'retry_after': 7}})]
+    sleeps = []
+    out = _client(stub, sleeps).send(1, 'ciao')
+    assert out['ok'] and out['attempts'] == 2
+    assert sleeps == [7.0]
+    assert [p for p, _ in stub.log] == ['/botTOKEN/sendMessage'] * 2
+
+
+def test_5xx_retries_with_exponential_backoff(stub):
+    stub.script[1] = [(502, {'ok': False}), (503, {'ok': False}), (500, {'ok': False})]
+    sleeps = []
+    out = _client(stub, sleeps, backoff=0.5).send(1, 'ciao')
+    assert out['ok'] and out['attempts'] == 4
+    assert sleeps == [0.5, 1.0, 2.0]
+
+    stub.script[2] = [(502, {'ok': False})] * 3
+    sleeps = []
+    out = _client(stub, sleeps, retries=3).send(2, 'ciao')
+    assert not out['ok'] and out['status'] == 502 and out['attempts'] == 3
+    assert sleeps == [1.0, 2.0]
+
+
+def test_bad_markdown_falls_back_to_plain_text(stub):
+    stub.script[1] = [(400, {'ok': False, 'error_code': 400,
+                             'description': "Bad Request: can't parse entities: Can't find end of the entity"})]
+    sleeps = []
+    out = _client(stub, sleeps).send(1, '*aperto senza chiusura')
+    assert out['ok'] and out.get('plain') and out['attempts'] == 2
+    assert sleeps == []
+    (_, first), (_, second) = stub.log
+    assert first['parse_mode'] == 'Markdown' and 'parse_mode' not in second
+    assert first['text'] == second['text'] == '*aperto senza chiusura'
+
+
+def test_broadcast_keeps_chunk_order_per_chat(stub):
+    text = "\n\n".join(f"*sezione {i}*\n" + f"riga {i}\n" * 300 for i in range(12))
+    chunks = split_message(text)
+    assert len(chunks) > 3
+    # Un 429 e un 5xx a metà non devono scambiare i pezzi della chat
+    stub.script[20] = [OK, (429, {'ok': False, 'parameters': {'retry_after': 1}})]
+    stub.script[30] = [OK, OK, (502, {'ok': False})]
+    sleeps = []
+    out = _client(stub, sleeps, pool=3).broadcast([10, 20, 30], text)
+    assert all(len(r) == len(chunks) and all(x['ok'] for x in r) for r in out.values())
+    assert out[20][1]['attempts'] == 2 and out[30][2]['attempts'] == 2
+    for cid in (10, 20, 30):
+        assert [b['text'] for b in stub.delivered if b['chat_id'] == cid] == chunks
+    assert sorted(sleeps) == [1.0, 1.0]
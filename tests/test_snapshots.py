@@ -0,0 +1,49 @@
+import os
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from snapshots import append, query
+
+
+def _day(iso):
+    return int(np.datetime64(iso, 'D').astype(np.int64))
+
+
+def _record(asset, day, ts):
+    return {'ts': ts, 'day': _day(day), 'asset': asset, 'sp_chg': 0.1, 'nk_chg': -0.2, 'fut_chg': 0.3, 'vix': 18.0,
+            'mom': 0.0007, 'entry_price': 100.0, 'last_price': 101.0, 'long': 1, 'short': 0}
+
+
+def _run(day_by_asset, when):
+    ts = int(np.datetime64(when, 's').astype(np.int64))
+    return [_record(a, d, ts) for a, d in day_by_asset.items()]
+
+
+def test_query_with_mixed_last_days(tmp_path):
+    # Primo run: FTSEMIB una seduta indietro; 'day' scende all'interno del run
+    append(_run({'DAX': '2026-10-15', 'FTSEMIB': '2026-10-14', 'CAC': '2026-10-15'}, '2026-10-15T08:01'), str(tmp_path))
+    append(_run({'DAX': '2026-10-16', 'FTSEMIB': '2026-10-16', 'CAC': '2026-10-16'}, '2026-10-16T08:01'), str(tmp_path))
+
+    snaps, _ = query('2026-10-14', '2026-10-14', ['FTSEMIB'], str(tmp_path))
+    assert len(snaps) == 1 and snaps['day'][0] == _day('2026-10-14')
+
+    snaps, _ = query(None, '2026-10-14', data_dir=str(tmp_path))
+    assert len(snaps) == 1
+
+    snaps, _ = query('2026-10-15', None, data_dir=str(tmp_path))
+    assert sorted(snaps['day'].tolist()) == [_day('2026-10-15')] * 2 + [_day('2026-10-16')] * 3
+
+    snaps, schema = query(data_dir=str(tmp_path))
+    assert len(snaps) == 6 and schema['assets'] == ['DAX', 'FTSEMIB', 'CAC']
+
+
+def test_query_lagging_market_recorded_late(tmp_path):
+    # Mercato chiuso a lungo: la stessa seduta vecchia registrata in run molto successivi
+    for when in ('2026-10-15T08:01', '2026-10-20T08:01', '2026-10-27T08:01'):
+        append(_run({'DAX': when[:10], 'IBEX': '2026-10-14'}, when), str(tmp_path))
+
+    snaps, _ = query('2026-10-14', '2026-10-14', ['IBEX'], str(tmp_path))
+    assert len(snaps) == 3
+    snaps, _ = query('2026-10-20', '2026-10-27', data_dir=str(tmp_path))
+    assert snaps['asset'].tolist() == [0, 0]
@@ -0,0 +1,41 @@
+# =============================================================================
+# QUANT-PRO - UNIVERSO DEGLI STRUMENTI (TICKER, MOLTIPLICATORI, NOMI) DA CONFIG
+# =============================================================================
+# universe.json (o QUANT_UNIVERSE=<file>):
+#   predictors: ticker usati da momentum, VIX, candele e predittori live
+#   assets:     [{key, ticker, name, mult}] nell'ordine di dashboard, artefatto e bot
+# Aggiungere un indice = aggiungere una riga: motore, pagina, bot e ottimizzatore la leggono da qui.
+
+import os
+import json
+
+UNIVERSE_FILE = os.getenv('QUANT_UNIVERSE', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'universe.json'))
+REQUIRED_PREDICTORS = ('^GSPC', '^N225', '^VIX', 'ES=F')
+
+
+def load_universe(path=UNIVERSE_FILE):
+    with open(path, encoding='utf-8') as f:
+        u = json.load(f)
+    missing = [tk for tk in REQUIRED_PREDICTORS if tk not in u.get('predictors', [])]
+    if missing: raise ValueError(f"{path}: predittori mancanti {missing}")
+    keys = [a['key'] for a in u['assets']]
+    if len(set(keys)) != len(keys): raise ValueError(f"{path}: chiavi asset duplicate")
+    for a in u['assets']:
+        a.setdefault('name', a['key'])
+        a.setdefault('mult', 1)
+    return u
+
+
+def targets(u):
+    return {a['key']: a['ticker'] for a in u['assets']}
+
+
+def multipliers(u):
+    return {a['key']: a['mult'] for a in u['assets']}
+
+
+def names(u):
+    return {a['key']: a['name'] for a in u['assets']}
+
+
+UNIVERSE = load_universe()